@@ -0,0 +1,80 @@
+# benchmarks/fake_llm.py
+"""
+Fake Gemini backend with a controllable latency distribution and 429 rate.
+Plugs into `Processor(client=FakeGeminiClient(...))`.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from types import SimpleNamespace
+
+SIGNAL_TYPES = ["Release", "Engineering Blog", "Framework Update", "Paper", "General News"]
+
+
+class FakeRateLimitError(Exception):
+    """Mimics the 429 RESOURCE_EXHAUSTED error raised by google-genai."""
+
+    def __init__(self):
+        super().__init__("429 RESOURCE_EXHAUSTED. Synthetic rate limit from the benchmark backend.")
+        self.code = 429
+
+
+class _FakeResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        # Roughly 4 characters per token
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+        )
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    async def generate_content(self, model: str, contents: str, config: dict = None):
+        return await self.client.generate(contents, config or {})
+
+
+class FakeGeminiClient:
+    """
+    Latency per call is lognormal around `latency_median_ms` (sigma `latency_sigma`).
+    A `rate_limit_rate` fraction of calls raise FakeRateLimitError after the latency.
+    Responses are deterministic per prompt, so curation picks the same items every run.
+    """
+
+    def __init__(self, latency_median_ms: float = 20.0, latency_sigma: float = 0.5,
+                 rate_limit_rate: float = 0.0, seed: int = 0):
+        self.latency_median = latency_median_ms / 1000.0
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.rate_limited = 0
+        self.aio = SimpleNamespace(models=_FakeModels(self))
+
+    async def generate(self, prompt: str, config: dict):
+        self.calls += 1
+        await asyncio.sleep(self.latency_median * self.rng.lognormvariate(0, self.latency_sigma))
+        if self.rng.random() < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise FakeRateLimitError()
+
+        if config.get("response_mime_type") != "application/json":
+            return _FakeResponse("Synthetic global summary: agents and retrieval dominate today's updates.", prompt)
+        if "plan_html" in prompt:
+            return _FakeResponse(json.dumps({"plan_html": "<div class=\"saturday-plan\"><p class=\"plan-intro\">Synthetic plan.</p></div>"}), prompt)
+
+        digest = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        result = {
+            "summary": "\n* **Synthetic** summary point one.\n* Point two about **agents**.\n* Point three on impact.",
+            "key_results": [f"Result {n}" for n in range(1, 6)],
+            "relevance_score": 1 + digest % 10,
+            "signal_type": SIGNAL_TYPES[digest % len(SIGNAL_TYPES)],
+            "one_sentence_takeaway": "OpenAI releases a synthetic benchmark item for RAG and LLM Agents.",
+            "lead_institution": "Synthetic Lab",
+            "tags": ["RAG", "LLM Agents", "Benchmark", "Synthetic", "Test"],
+        }
+        return _FakeResponse(json.dumps(result), prompt)
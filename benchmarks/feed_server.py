@@ -0,0 +1,204 @@
+# benchmarks/feed_server.py
+"""
+Local HTTP server serving synthetic RSS/Atom feeds and an ArXiv-like query API,
+so the pipeline can be benchmarked without the live internet.
+"""
+import datetime
+import random
+import threading
+import time
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+WORDS = ("agent", "model", "retrieval", "reasoning", "benchmark", "latency", "inference", "fine-tuning",
+         "multimodal", "context", "token", "evaluation", "pipeline", "embedding", "open-source", "release")
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+class _ThreadingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The fetcher opens up to 100 connections at once
+    request_queue_size = 256
+
+
+class SyntheticFeedServer:
+    """
+    Serves `num_feeds` feeds at /feeds/<i>.xml (every third one as Atom) and an ArXiv-like
+    API at /api/query. Behavior per feed is deterministic for a given seed:
+    - forbidden_rate: feeds answering 403 to httpx but 200 to the urllib fallback (like MIT News)
+    - not_modified_rate: feeds always answering 304
+    - error_rate: per-request probability of a 500
+    """
+
+    def __init__(self, num_feeds: int, items_per_feed: int = 3, old_items_per_feed: int = 5,
+                 summary_words: int = 60, arxiv_papers: int = 100, latency_ms=(5, 50),
+                 error_rate: float = 0.0, forbidden_rate: float = 0.0, not_modified_rate: float = 0.0,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.num_feeds = num_feeds
+        self.items_per_feed = items_per_feed
+        self.old_items_per_feed = old_items_per_feed
+        self.summary_words = summary_words
+        self.arxiv_papers = arxiv_papers
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.now = datetime.datetime.now(datetime.timezone.utc)
+        rng = random.Random(seed)
+        self.forbidden = {i for i in range(num_feeds) if rng.random() < forbidden_rate}
+        self.not_modified = {i for i in range(num_feeds) if i not in self.forbidden and rng.random() < not_modified_rate}
+        self._request_rng = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.httpd = _ThreadingServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def feed_urls(self):
+        return [f"{self.base_url}/feeds/{i}.xml" for i in range(self.num_feeds)]
+
+    @property
+    def arxiv_url(self) -> str:
+        return f"{self.base_url}/api/query"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._request_rng.random()
+
+    def _latency(self) -> float:
+        low, high = self.latency_ms
+        with self._lock:
+            return self._request_rng.uniform(low, high) / 1000.0
+
+    def render_feed(self, index: int) -> bytes:
+        if index in self._cache:
+            return self._cache[index]
+        rng = random.Random(self.seed * 100_003 + index)
+        entries = []
+        for n in range(self.items_per_feed + self.old_items_per_feed):
+            # Fresh items fall inside the fetcher's lookback window, old ones are filtered out
+            hours = rng.uniform(0, 24) if n < self.items_per_feed else rng.uniform(100, 1000)
+            entries.append({
+                "title": _text(rng, 8),
+                "link": f"https://feed{index}.example.com/posts/{n}",
+                "summary": _text(rng, self.summary_words),
+                "published": self.now - datetime.timedelta(hours=hours),
+            })
+
+        title = f"Synthetic Feed {index}"
+        if index % 3 == 2:
+            body = "".join(
+                f"<entry><title>{escape(e['title'])}</title><link href=\"{e['link']}\"/>"
+                f"<id>{e['link']}</id><updated>{e['published'].isoformat()}</updated>"
+                f"<summary>{escape(e['summary'])}</summary></entry>"
+                for e in entries
+            )
+            doc = (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                   f"<title>{title}</title><updated>{self.now.isoformat()}</updated>{body}</feed>")
+        else:
+            body = "".join(
+                f"<item><title>{escape(e['title'])}</title><link>{e['link']}</link>"
+                f"<description>{escape(e['summary'])}</description>"
+                f"<pubDate>{format_datetime(e['published'])}</pubDate></item>"
+                for e in entries
+            )
+            doc = (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                   f"<title>{title}</title>{body}</channel></rss>")
+        content = doc.encode("utf-8")
+        self._cache[index] = content
+        return content
+
+    def render_arxiv(self, start: int, max_results: int) -> bytes:
+        end = min(self.arxiv_papers, start + max_results)
+        entries = []
+        for n in range(start, end):
+            rng = random.Random(self.seed * 7_919 + n)
+            published = (self.now - datetime.timedelta(hours=rng.uniform(0, 24))).strftime("%Y-%m-%dT%H:%M:%SZ")
+            entry_id = f"http://arxiv.org/abs/2601.{n:05d}v1"
+            entries.append(
+                f"<entry><id>{entry_id}</id><updated>{published}</updated><published>{published}</published>"
+                f"<title>{escape(_text(rng, 10))}</title><summary>{escape(_text(rng, 150))}</summary>"
+                f"<author><name>Author {n}</name></author>"
+                f'<link href="{entry_id}" rel="alternate" type="text/html"/>'
+                f'<arxiv:primary_category term="cs.CL"/><category term="cs.CL"/></entry>'
+            )
+        doc = ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+               'xmlns:arxiv="http://arxiv.org/schemas/atom"><title>ArXiv Query</title>'
+               f"<opensearch:totalResults>{self.arxiv_papers}</opensearch:totalResults>"
+               f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+               f"<opensearch:itemsPerPage>{max_results}</opensearch:itemsPerPage>"
+               + "".join(entries) + "</feed>")
+        return doc.encode("utf-8")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", content_type: str = "application/xml"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(server._latency())
+                parsed = urlparse(self.path)
+                if server._random() < server.error_rate:
+                    return self._send(500, b"synthetic error", "text/plain")
+
+                if parsed.path == "/api/query":
+                    query = parse_qs(parsed.query)
+                    start = int(query.get("start", ["0"])[0])
+                    max_results = int(query.get("max_results", ["100"])[0])
+                    return self._send(200, server.render_arxiv(start, max_results), "application/atom+xml")
+
+                if parsed.path.startswith("/feeds/") and parsed.path.endswith(".xml"):
+                    try:
+                        index = int(parsed.path[len("/feeds/"):-len(".xml")])
+                    except ValueError:
+                        return self._send(404)
+                    if not 0 <= index < server.num_feeds:
+                        return self._send(404)
+                    if index in server.not_modified:
+                        return self._send(304)
+                    # urllib (the fetcher's 403 fallback) sends Accept-Encoding: identity, httpx does not
+                    if index in server.forbidden and self.headers.get("Accept-Encoding") != "identity":
+                        return self._send(403, b"forbidden", "text/plain")
+                    return self._send(200, server.render_feed(index))
+
+                return self._send(404)
+
+        return Handler
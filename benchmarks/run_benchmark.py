@@ -0,0 +1,245 @@
+# benchmarks/run_benchmark.py
+"""
+End-to-end pipeline benchmark against a local feed server and a fake Gemini backend.
+
+    python -m benchmarks.run_benchmark                      # 1x, 10x, 100x today's feed count
+    python -m benchmarks.run_benchmark --scales 1 10 --output bench_output.json
+    python -m benchmarks.run_benchmark --baseline bench_output.json   # exit 1 on regression
+    python -m benchmarks.run_benchmark --scales 10 --workers 4        # sharded ingestion
+
+Each scale runs in a fresh process (accurate peak RSS; with --workers, the coordinator plus
+the largest worker's peak once per worker) inside a temporary directory,
+so backlog.json, logs/ and daily_digest.* in the repo are never touched.
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from modules import config
+from benchmarks.feed_server import SyntheticFeedServer
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _configure(feed_urls, arxiv_url, quiet=False):
+    """Points the pipeline at the local servers (also run in every shard worker process)."""
+    config.RSS_FEEDS = feed_urls
+    config.ARXIV_API_URL = arxiv_url
+    config.ARXIV_PAGE_DELAY_SECONDS = 0
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+
+
+def _fake_processor(args):
+    from modules.processor import Processor
+    from benchmarks.fake_llm import FakeGeminiClient
+
+    fake = FakeGeminiClient(latency_median_ms=args.llm_latency_ms, latency_sigma=args.llm_latency_sigma,
+                            rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    return Processor(client=fake)
+
+
+async def _run_pipeline(args, feed_urls, arxiv_url):
+    import orchestrator
+    from modules import metrics
+
+    _configure(feed_urls, arxiv_url)
+    metrics.enable()
+    processor = _fake_processor(args)
+    fake = processor.client
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        from modules.sharding import sharded_ingest
+        processed_items = await sharded_ingest(
+            args.workers,
+            processor_factory=functools.partial(_fake_processor, args),
+            initializer=functools.partial(_configure, feed_urls, arxiv_url, quiet=True),
+        )
+        raw_items = processed_items
+    else:
+        raw_items = await orchestrator.fetch_stage()
+        await orchestrator.enrich_stage(raw_items)
+        processed_items = await orchestrator.process_stage(processor, raw_items)
+    orchestrator.relate_stage(processed_items)
+    curated_data = orchestrator.curate_stage(processed_items, args.weekend)
+    global_summary, trending_info = await orchestrator.summary_stage(processor, curated_data, args.weekend)
+    orchestrator.render_stage(curated_data, global_summary, trending_info)
+    wall = time.perf_counter() - start
+
+    report = metrics._registry.report()
+    return {
+        "wall_seconds": round(wall, 3),
+        "items": len(raw_items),
+        "items_per_second": round(len(raw_items) / wall, 2) if wall else 0.0,
+        "stages": {name[len("stage."):]: round(duration, 3) for name, duration in report["stages"].items()},
+        # Only the coordinator's calls when sharded; workers run their own fake clients
+        "llm_calls": fake.calls,
+        "llm_rate_limited": fake.rate_limited,
+        "digest_bytes": os.path.getsize("daily_digest.html"),
+    }
+
+
+def _run_scale(args, feed_urls, arxiv_url, queue):
+    """Child process entry point: runs one scale in a scratch directory."""
+    workdir = tempfile.mkdtemp(prefix="research-agent-bench-")
+    try:
+        shutil.copytree(os.path.join(REPO_ROOT, "templates"), os.path.join(workdir, "templates"))
+        os.chdir(workdir)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = asyncio.run(_run_pipeline(args, feed_urls, arxiv_url))
+        # RUSAGE_CHILDREN is the largest joined shard worker; count it once per worker process
+        worker_peak = _peak_rss_mb(resource.RUSAGE_CHILDREN) if args.workers > 1 else 0.0
+        result["worker_peak_rss_mb"] = round(worker_peak, 1)
+        result["peak_rss_mb"] = round(_peak_rss_mb() + worker_peak * (args.workers - 1), 1)
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": repr(e)})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_scale(args, scale: int) -> dict:
+    num_feeds = max(1, len(config.RSS_FEEDS) * scale)
+    server = SyntheticFeedServer(
+        num_feeds=num_feeds,
+        items_per_feed=args.items_per_feed,
+        arxiv_papers=args.arxiv_papers,
+        latency_ms=(args.feed_latency_min_ms, args.feed_latency_max_ms),
+        error_rate=args.error_rate,
+        forbidden_rate=args.forbidden_rate,
+        not_modified_rate=args.not_modified_rate,
+        seed=args.seed,
+    )
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    with server:
+        proc = ctx.Process(target=_run_scale, args=(args, server.feed_urls, server.arxiv_url, queue))
+        proc.start()
+        result = _wait_for_result(proc, queue, args.timeout)
+    result.update({"scale": scale, "feeds": num_feeds})
+    return result
+
+
+def _wait_for_result(proc, queue, timeout: float) -> dict:
+    """Waits for the child's result without hanging if it crashes (or exceeds `timeout`)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            if not proc.is_alive():
+                # It may have put its result right before exiting
+                try:
+                    result = queue.get(timeout=1)
+                except queue_module.Empty:
+                    result = {"error": f"benchmark process exited with code {proc.exitcode}"}
+                break
+            if time.monotonic() > deadline:
+                proc.terminate()
+                result = {"error": f"timed out after {timeout:.0f}s"}
+                break
+    proc.join()
+    return result
+
+
+def check_regressions(results, baseline_path: str, tolerance: float):
+    with open(baseline_path, "r") as f:
+        baseline = {r["scale"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get(result["scale"])
+        if not base or "error" in base or "error" in result:
+            continue
+        if result["wall_seconds"] > base["wall_seconds"] * (1 + tolerance):
+            regressions.append(f"{result['scale']}x wall time {base['wall_seconds']}s -> {result['wall_seconds']}s")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['scale']}x peak RSS {base['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+    return regressions
+
+
+def print_table(results):
+    stage_names = ["fetch", "enrich", "process", "relate", "curate", "summary", "trending", "render"]
+    header = f"{'scale':>6} {'feeds':>6} {'items':>7} {'wall s':>8} {'items/s':>8} {'RSS MB':>8} " + " ".join(f"{s:>8}" for s in stage_names)
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['scale']:>5}x  ERROR: {r['error']}")
+            continue
+        stages = " ".join(f"{r['stages'].get(s, 0):>8.2f}" for s in stage_names)
+        print(f"{r['scale']:>5}x {r['feeds']:>6} {r['items']:>7} {r['wall_seconds']:>8.2f} {r['items_per_second']:>8.1f} {r['peak_rss_mb']:>8.1f} {stages}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Fetcher -> Processor -> Curator -> Designer offline.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Multiples of today's feed count.")
+    parser.add_argument("--items-per-feed", type=int, default=3, help="Fresh items per feed (inside the lookback window).")
+    parser.add_argument("--arxiv-papers", type=int, default=config.ARXIV_MAX_RESULTS)
+    parser.add_argument("--feed-latency-min-ms", type=float, default=5)
+    parser.add_argument("--feed-latency-max-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Per-request probability of a 500.")
+    parser.add_argument("--forbidden-rate", type=float, default=0.05, help="Share of feeds returning 403 to httpx.")
+    parser.add_argument("--not-modified-rate", type=float, default=0.0, help="Share of feeds returning 304.")
+    parser.add_argument("--llm-latency-ms", type=float, default=20, help="Median fake Gemini latency.")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5, help="Lognormal sigma of fake Gemini latency.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of fake Gemini calls answering 429.")
+    parser.add_argument("--workers", type=int, default=1, help="Run fetch/process through the shard queue with N workers.")
+    parser.add_argument("--weekend", action="store_true", help="Benchmark weekend curation (adds the trending call).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600, help="Give up on a scale after this many seconds.")
+    parser.add_argument("--output", help="Write results as JSON (usable as a --baseline later).")
+    parser.add_argument("--baseline", help="Previous --output file; exit 1 if wall time or RSS regress.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression vs baseline (0.2 = 20%%).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for scale in args.scales:
+        print(f"[Benchmark] Running {scale}x ({len(config.RSS_FEEDS) * scale} feeds)...")
+        results.append(run_scale(args, scale))
+
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\n[Benchmark] Results saved to {args.output}")
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\n[Benchmark] ✗ Regressions detected:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\n[Benchmark] ✓ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    if any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
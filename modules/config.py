@@ -56,6 +56,9 @@ RSS_FEEDS = [
     "https://hnrss.org/newest?q=OpenClaw+OR+Qwen+OR+TinyFish+OR+%22Seed+2.0%22+OR+%22Seed+2%22+OR+%22MCP+support%22+OR+%22GPT-5%22+OR+%22Claude+4%22+OR+%22Gemini+3%22+OR+%22delegate+work%22+OR+%22Gemini+attackers%22+OR+%22MCP%22&points=30",
 ]
 
+# Max feeds fetched at once
+RSS_FETCH_CONCURRENCY = 20
+
 USER_INTERESTS = [
     "Vibe Coding", 
     "RAG", 
@@ -73,3 +76,54 @@ USER_INTERESTS = [
 # Broader query to capture more candidates for LLM filtering
 ARXIV_QUERY = 'abs:LLM OR abs:Agent OR abs:RAG OR abs:"Machine Learning" OR abs:"Generative AI" OR abs:"Multimodal" OR abs:"Reasoning"'
 ARXIV_MAX_RESULTS = 100  # Increased to let LLM decide relevance
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_PAGE_DELAY_SECONDS = 3.0  # ArXiv API etiquette between result pages
+
+# Gmail clips HTML emails above ~102KB; the optimized digest is trimmed to fit this budget
+EMAIL_SIZE_BUDGET_BYTES = 100_000
+
+# Daemon mode (`python orchestrator.py serve`)
+POLL_INTERVAL_MINUTES = 30
+DIGEST_TIME_UTC = "00:00"  # Matches the GitHub Actions cron (8:00 AM Beijing)
+DIGEST_RETRY_MINUTES = 15  # Wait before retrying a failed digest (pending items are kept)
+PENDING_STORE_FILE = "pending_items.json"
+SEEN_RETENTION_HOURS = 96  # Longer than the 72h Monday lookback so nothing is processed twice
+PROCESS_MAX_ATTEMPTS = 4  # Gemini attempts per item before the daemon gives up on it
+PROCESS_RETRY_BACKOFF_MINUTES = 30  # Wait before retrying a failed item, doubled after each failure
+
+# Metrics (`python orchestrator.py --metrics ...`): Prometheus textfile for node_exporter
+METRICS_PROM_FILE = "metrics.prom"
+
+# Sharded ingestion (`python orchestrator.py shard --workers N`)
+SHARD_QUEUE_FILE = "work_queue.db"
+SHARD_FEEDS_PER_UNIT = 20  # Matches RSS_FETCH_CONCURRENCY so one unit saturates a worker's fetcher
+SHARD_ITEMS_PER_UNIT = 25
+SHARD_LEASE_SECONDS = 600  # A unit held longer than this by a dead worker is handed out again
+SHARD_MAX_ATTEMPTS = 3
+SHARD_SHARED_STORAGE = False  # True when workers on other machines share the queue file (disables WAL)
+
+# Full-text enrichment of thin entries (hnrss, any-feeds, GitHub atom) before processing
+ENRICH_ENABLED = True
+ENRICH_MIN_SUMMARY_CHARS = 200  # Entries with less visible summary text get the linked page's text
+ENRICH_MAX_BYTES = 512_000  # Stop reading a page after this many bytes
+ENRICH_MAX_TEXT_CHARS = 4_000  # ...or once this much text is extracted (keeps prompts small)
+ENRICH_TIMEOUT_SECONDS = 10.0
+ENRICH_CONCURRENCY = 10
+ENRICH_PER_HOST_CONCURRENCY = 2  # Be polite to news.ycombinator.com, github.com, etc.
+ENRICH_CACHE_FILE = ".cache/enrich.json"
+ENRICH_CACHE_MAX_ENTRIES = 2_000
+
+# Historical backfill (`python orchestrator.py backfill --start ... --end ...`)
+BACKFILL_DIR = "logs/backfill"  # Fetch cache, LLM cache and per-day backlog snapshots
+BACKFILL_OUTPUT_DIR = "digests"  # digests/<date>/daily_digest.*
+BACKFILL_LLM_CONCURRENCY = 20  # Gemini calls in flight (the daily run uses 5)
+BACKFILL_PARALLEL_DAYS = 4  # Days summarized and rendered at once
+
+# Related-coverage index: links items to earlier digests and down-weights near-repeats
+RELATED_INDEX_ENABLED = True
+RELATED_INDEX_DIR = ".cache/related"
+RELATED_MAX_TERMS = 64  # Terms kept per item: ~95MB on disk at 100k items, ~1ms per lookup
+RELATED_TOP_K = 3  # "Previously covered" links per item
+RELATED_MIN_SIMILARITY = 0.15  # Cosine similarity to count as related coverage (unrelated items: < 0.05)
+RELATED_REPEAT_SIMILARITY = 0.45  # ...and to count as a near-repeat
+RELATED_REPEAT_PENALTY = 3  # Subtracted from a near-repeat's relevance score during curation
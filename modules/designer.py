@@ -1,86 +1,127 @@
 # modules/designer.py
 import os
-from jinja2 import Environment, FileSystemLoader
+import json
+import html
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import datetime
 import re
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, Pattern
 from . import config
 
+# Common tech names always highlighted alongside the user's interests
+TECH_TERMS = ['Claude', 'Gemini', 'GPT', 'OpenAI', 'Anthropic', 'Google', 'Meta', 'Meta AI', 'RAG', 'Agent', 'Llama', 'NVIDIA', 'LLM', 'DeepMind']
+
+# Compiled Jinja templates are cached here between runs
+TEMPLATE_CACHE_DIR = os.path.join(".cache", "jinja")
+
+# Templates per output format; "json" is built directly as a JSON Feed
+TEMPLATES = {
+    "html": "email_template.html",
+    "text": "email_template.txt",
+    "markdown": "digest_template.md",
+}
+OUTPUT_FORMATS = ("html", "text", "markdown", "json")
+OUTPUT_FILES = {
+    "html": "daily_digest.html",
+    "text": "daily_digest.txt",
+    "markdown": "daily_digest.md",
+    "json": "daily_digest.json",
+}
+
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+BLOCK_END_PATTERN = re.compile(r'<br\s*/?>|</(?:p|div|li|h[1-6]|ul|ol)>', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def html_to_text(value: str) -> str:
+    """Converts LLM-generated HTML (e.g. the Saturday plan) into readable plain text."""
+    text = BLOCK_END_PATTERN.sub('\n', value or '')
+    text = html.unescape(TAG_PATTERN.sub('', text))
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+@lru_cache(maxsize=8)
+def _compile_highlighter(terms: tuple) -> Pattern:
+    """Builds a single alternation regex for the given terms (cached per term set)."""
+    # Deduplicate, then sort by length descending to match longest terms first
+    unique_terms = sorted(set(terms), key=len, reverse=True)
+    pattern = r'\b(' + '|'.join(map(re.escape, unique_terms)) + r')\b'
+    return re.compile(pattern, flags=re.IGNORECASE)
+
+
+def build_highlighter(extra_terms: Iterable[str] = None) -> Pattern:
+    """Returns the entity highlighter for the tech terms plus the given interests."""
+    terms = list(TECH_TERMS)
+    terms.extend(extra_terms if extra_terms is not None else config.USER_INTERESTS)
+    return _compile_highlighter(tuple(terms))
+
+
 class Designer:
-    def __init__(self, template_dir="templates"):
-        self.env = Environment(loader=FileSystemLoader(template_dir))
-        self.template = self.env.get_template("email_template.html")
+    def __init__(self, template_dir="templates", cache_dir=TEMPLATE_CACHE_DIR):
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        # trim_blocks keeps the plaintext and Markdown templates free of stray blank lines
+        self.env = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=bytecode_cache,
+                               trim_blocks=True, lstrip_blocks=True)
+        self.env.filters['html_to_text'] = html_to_text
+        self.templates = {"html": self.env.get_template(TEMPLATES["html"])}
+        # Entities to highlight orange (AlphaSignal style), compiled once per profile
+        self.highlighter = build_highlighter()
 
-    def render(self, data: dict, global_summary: str = None, trending_info: dict = None) -> str:
+    def highlight_entities(self, text: str) -> str:
+        return self.highlighter.sub(r'<span class="highlight-orange">\1</span>', text)
+
+    def prepare_context(self, data: dict, global_summary: str = None, trending_info: dict = None,
+                        date: datetime.date = None) -> dict:
         """
-        Renders the HTML digest.
-        data: Dict returned by Curator.
+        Pre-processes curated items once so every output format can share them.
+        data: Dict returned by Curator (lists of Items).
+        date: Digest date shown in the outputs (defaults to today; set for re-renders and backfills).
         """
-        # Calculate read time (approx 200 wpm)
-        total_words = 0
         detailed_items = data.get('detailed_items', [])
         signals = data.get('signals', [])
         
         # Clean markdown from global summary if present
         if global_summary:
             global_summary = global_summary.replace('**', '')
-            
-        if trending_info:
-            # Plan HTML is already formatted by Processor
-            pass
 
+        # Single pass over detailed items: prepare HTML, count words and group by category
+        # { "Top News": [item1, item2], "Top Paper": [item3] }
+        total_words = 0
+        category_map = {}
         for item in detailed_items:
-            processed = item.get('processed', {})
-            summary = processed.get('summary', '')
-            
-            # Entities to highlight orange (AlphaSignal style)
-            # This is a heuristic - we highlight capitalized words or specific tech terms
-            def highlight_entities(text):
-                # Common tech names + User Interests
-                tech_terms = ['Claude', 'Gemini', 'GPT', 'OpenAI', 'Anthropic', 'Google', 'Meta', 'Meta AI', 'RAG', 'Agent', 'Llama', 'NVIDIA', 'LLM', 'DeepMind']
-                # Add user interests to highlight list
-                tech_terms.extend(config.USER_INTERESTS)
-                
-                # Deduplicate
-                tech_terms = list(set(tech_terms))
-                # Sort by length descending to match longest terms first
-                tech_terms.sort(key=len, reverse=True)
-                
-                # Single regex for all terms
-                pattern = r'\b(' + '|'.join(map(re.escape, tech_terms)) + r')\b'
-                return re.sub(pattern, r'<span class="highlight-orange">\1</span>', text, flags=re.IGNORECASE)
-
+            processed = item.processed
+            summary = processed.summary
             if summary:
-                processed['summary_html'] = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', summary).replace('\n', '<br>')
+                processed.summary_html = BOLD_PATTERN.sub(r'<strong>\1</strong>', summary).replace('\n', '<br>')
+                processed.summary_clean = summary.replace('**', '').strip()
                 total_words += len(summary.split())
             
-            takeaway = processed.get('one_sentence_takeaway', '')
+            takeaway = processed.one_sentence_takeaway
             if takeaway:
-                processed['takeaway_clean'] = takeaway.replace('**', '')
+                processed.takeaway_clean = takeaway.replace('**', '')
                 # Process takeaway with orange highlights
-                processed['takeaway_html'] = highlight_entities(takeaway.replace('**', ''))
+                processed.takeaway_html = self.highlight_entities(processed.takeaway_clean)
+
+            category_map.setdefault(item.display_category or 'Top News', []).append(item)
 
         for item in signals:
-            processed = item.get('processed', {})
-            takeaway = processed.get('one_sentence_takeaway', '')
+            processed = item.processed
+            takeaway = processed.one_sentence_takeaway
             if takeaway:
-                processed['takeaway_clean'] = takeaway.replace('**', '')
+                processed.takeaway_clean = takeaway.replace('**', '')
                 total_words += len(takeaway.split())
             
+        # Calculate read time (approx 200 wpm)
         read_time_val = max(1, round(total_words / 200))
         # Format read time like AlphaSignal (e.g. 4 min 29 sec)
         # We'll just simulate the seconds for flavor or keep it simple.
-        import random
         read_time_str = f"{read_time_val} min {random.randint(10, 55)} sec"
-        
-        # Prepare summary groups
-        # We need to group detailed items by category for the template
-        # { "Top News": [item1, item2], "Top Paper": [item3] }
-        category_map = {}
-        for item in detailed_items:
-            cat = item.get('display_category', 'Top News')
-            if cat not in category_map:
-                category_map[cat] = []
-            category_map[cat].append(item)
             
         # Define a consistent order for categories
         category_order = ["Top News", "Top Paper", "Top Repo", "Top Video", "Top Blog"]
@@ -94,8 +135,8 @@ class Designer:
             if cat not in category_order:
                 sorted_categories.append({"name": cat, "content_items": category_map[cat]})
 
-        context = {
-            "date": datetime.datetime.now().strftime("%B %d, %Y"),
+        return {
+            "date": (date or datetime.date.today()).strftime("%B %d, %Y"),
             "read_time": read_time_str,
             "detailed_items": detailed_items, # Keep raw list just in case
             "grouped_items": sorted_categories, # New grouped structure
@@ -104,5 +145,61 @@ class Designer:
             "trending_info": trending_info,
             "items": data.get('items', [])
         }
-        
-        return self.template.render(context)
+
+    def render_json_feed(self, context: dict) -> str:
+        """Renders the digest as a JSON Feed 1.1 document."""
+        feed_items = []
+        sections = [("detailed", i) for i in context["detailed_items"]] + [("signal", i) for i in context["signals"]]
+        for section, item in sections:
+            processed = item.processed
+            entry = {
+                "id": item.link,
+                "url": item.link,
+                "title": item.title,
+                "summary": processed.takeaway_clean or '',
+                "tags": processed.tags,
+                "_research_agent": {
+                    "section": section,
+                    "category": item.display_category,
+                    "source": processed.lead_institution or item.source,
+                    "relevance_score": processed.relevance_score,
+                },
+            }
+            if item.related:
+                entry["_research_agent"]["previously_covered"] = item.related
+            if processed.summary_html:
+                entry["content_html"] = processed.summary_html
+                entry["content_text"] = processed.summary_clean
+            else:
+                entry["content_text"] = processed.takeaway_clean or item.title or ''
+            if item.published:
+                entry["date_published"] = item.published
+            feed_items.append(entry)
+
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": f"Research Agent Digest - {context['date']}",
+            "description": context.get("global_summary") or "",
+            "items": feed_items,
+        }
+        return json.dumps(feed, indent=2, ensure_ascii=False, default=str)
+
+    def render_format(self, context: dict, fmt: str) -> str:
+        if fmt == "json":
+            return self.render_json_feed(context)
+        if fmt not in TEMPLATES:
+            raise ValueError(f"Unknown output format: {fmt}")
+        if fmt not in self.templates:
+            self.templates[fmt] = self.env.get_template(TEMPLATES[fmt])
+        return self.templates[fmt].render(context)
+
+    def render_all(self, context: dict, formats=OUTPUT_FORMATS) -> Dict[str, str]:
+        """Renders every requested format from the same prepared context."""
+        return {fmt: self.render_format(context, fmt) for fmt in formats}
+
+    def render(self, data: dict, global_summary: str = None, trending_info: dict = None) -> str:
+        """
+        Renders the HTML digest.
+        data: Dict returned by Curator.
+        """
+        return self.render_format(self.prepare_context(data, global_summary, trending_info), "html")
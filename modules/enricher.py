@@ -0,0 +1,218 @@
+# modules/enricher.py
+"""
+Full-text enrichment for thin feed entries (hnrss, any-feeds, GitHub atom...), whose
+summary is too short for the Processor to score.
+
+Each linked page is streamed with a byte cap and a deadline. Readable text is extracted
+chunk by chunk, so only one chunk and the extracted text (capped too) are held in memory.
+Extracted text is cached by URL and revalidated with the page's ETag / Last-Modified.
+"""
+import asyncio
+import codecs
+import json
+import os
+import time
+from html.parser import HTMLParser
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import httpx
+
+from . import config
+from . import metrics
+from .models import Item
+
+# Text inside these tags is never article content
+SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "button", "template"}
+# Tags that end a block of text
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "pre", "blockquote", "h1", "h2", "h3", "h4",
+              "td", "br", "tr", "figcaption"}
+CHUNK_SIZE = 16_384
+
+
+def text_length(html: str) -> int:
+    """Length of the visible text of a feed summary."""
+    extractor = TextExtractor(max_chars=config.ENRICH_MIN_SUMMARY_CHARS + 1, min_block_chars=1)
+    extractor.feed(html or "")
+    extractor.close()
+    return len(extractor.text())
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental main-text extraction: keeps text blocks of at least `min_block_chars`
+    outside navigation/boilerplate tags, and reports `full` once `max_chars` are collected.
+    """
+
+    def __init__(self, max_chars: int, min_block_chars: int = 40):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.min_block_chars = min_block_chars
+        self.skip_depth = 0
+        self.blocks: List[str] = []
+        self.length = 0
+        self.current: List[str] = []
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if not self.skip_depth and not self.full:
+            self.current.append(data)
+
+    def _end_block(self):
+        block = " ".join("".join(self.current).split())
+        self.current = []
+        if len(block) >= self.min_block_chars and not self.full:
+            block = block[:self.max_chars - self.length]
+            self.blocks.append(block)
+            self.length += len(block) + 1
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+    def text(self) -> str:
+        return "\n".join(self.blocks)
+
+
+class Enricher:
+    """Adds `full_text` to items whose summary is shorter than ENRICH_MIN_SUMMARY_CHARS."""
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path or config.ENRICH_CACHE_FILE
+        self.cache: Dict[str, Dict] = self._load_cache()
+        self.sem = asyncio.Semaphore(config.ENRICH_CONCURRENCY)
+        self.host_sems: Dict[str, asyncio.Semaphore] = {}
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.5'
+        }
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[Enricher] Ignoring unreadable cache {self.cache_path}: {e}")
+            return {}
+
+    def save_cache(self):
+        # Keep the most recently used entries only
+        entries = sorted(self.cache.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)
+        self.cache = dict(entries[:config.ENRICH_CACHE_MAX_ENTRIES])
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Per-process temp file: shard workers may save concurrently
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def needs_enrichment(self, item: Item) -> bool:
+        if item.type == "paper" or item.full_text or not (item.link or "").startswith(("http://", "https://")):
+            return False
+        return text_length(item.summary) < config.ENRICH_MIN_SUMMARY_CHARS
+
+    def _host_sem(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self.host_sems:
+            self.host_sems[host] = asyncio.Semaphore(config.ENRICH_PER_HOST_CONCURRENCY)
+        return self.host_sems[host]
+
+    async def _stream_text(self, client: httpx.AsyncClient, url: str, span) -> str:
+        cached = self.cache.get(url)
+        headers = dict(self.headers)
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            span.set(status=response.status_code)
+            if response.status_code == 304 and cached:
+                metrics.incr("enrich_total", outcome="not_modified")
+                return cached["text"]
+            if response.status_code != 200:
+                raise Exception(f"HTTP Error {response.status_code}")
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type:
+                metrics.incr("enrich_total", outcome="not_html")
+                return ""
+
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+            extractor = TextExtractor(max_chars=config.ENRICH_MAX_TEXT_CHARS)
+            received = 0
+            # Our own cap, so a lying Content-Length or an endless stream can't grow memory
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                chunk = chunk[:config.ENRICH_MAX_BYTES - received]
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if extractor.full or received >= config.ENRICH_MAX_BYTES:
+                    break
+            extractor.close()
+            span.set(bytes=received)
+            metrics.observe("enrich_bytes", received, metrics.BYTES_BUCKETS)
+
+            text = extractor.text()
+            self.cache[url] = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "text": text,
+                "used": time.time(),
+            }
+            metrics.incr("enrich_total", outcome="fetched")
+            return text
+
+    async def _enrich_item(self, client: httpx.AsyncClient, item: Item):
+        # Per-host slot first: entries queued behind one busy host must not hold global slots
+        async with self._host_sem(item.link), self.sem:
+            with metrics.span("enrich.fetch", url=item.link) as span:
+                try:
+                    text = await asyncio.wait_for(self._stream_text(client, item.link, span),
+                                                  timeout=config.ENRICH_TIMEOUT_SECONDS)
+                except Exception as e:
+                    metrics.incr("enrich_total", outcome="error")
+                    # Fall back to a stale cached copy rather than scoring blind
+                    text = self.cache.get(item.link, {}).get("text", "")
+                    print(f"[Enricher]   ✗ {item.link[:60]}: {repr(e)}")
+                if item.link in self.cache:
+                    self.cache[item.link]["used"] = time.time()
+                span.set(chars=len(text))
+                if text:
+                    item.full_text = text
+
+    async def enrich(self, items: List[Item]) -> List[Item]:
+        """Fills `full_text` in place for thin items and returns the list."""
+        thin = [item for item in items if self.needs_enrichment(item)]
+        if not thin:
+            return items
+        print(f"[Enricher] Fetching full text for {len(thin)} thin entries (of {len(items)})...")
+        timeout = httpx.Timeout(config.ENRICH_TIMEOUT_SECONDS)
+        # SSL verify=False like the Fetcher, for sites with poor cert configurations
+        async with httpx.AsyncClient(verify=False, timeout=timeout) as client:
+            await asyncio.gather(*(self._enrich_item(client, item) for item in thin))
+        self.save_cache()
+        enriched = sum(1 for item in thin if item.full_text)
+        print(f"[Enricher] Enriched {enriched}/{len(thin)} entries")
+        return items
@@ -5,8 +5,10 @@ import time
 import arxiv
 import datetime
 from dateutil import parser
-from typing import List, Dict, Any
+from typing import List
 from . import config
+from . import metrics
+from .models import Item
 import urllib.request
 import urllib.error
 import ssl
@@ -16,14 +18,14 @@ import http.client
 import urllib3
 
 
-def _get_lookback_hours() -> int:
+def _get_lookback_hours(now: datetime.datetime = None) -> int:
     """
-    Determine how many hours to look back based on the current day.
+    Determine how many hours to look back based on the current day (or `now`, for backfills).
     - Monday (weekday=0): 72h to capture Friday, Saturday, and Sunday content.
     - Other weekdays: 36h to account for timezone differences and cron delays.
     - Weekend: 36h.
     """
-    weekday = datetime.datetime.now(datetime.timezone.utc).weekday()
+    weekday = (now or datetime.datetime.now(datetime.timezone.utc)).weekday()
     if weekday == 0:  # Monday
         return 72
     else:
@@ -31,27 +33,55 @@ def _get_lookback_hours() -> int:
 
 
 class Fetcher:
-    def __init__(self):
-        self.rss_feeds = config.RSS_FEEDS
+    def __init__(self, rss_feeds: List[str] = None, cutoff_date: datetime.datetime = None,
+                 end_date: datetime.datetime = None):
+        # Shard workers pass their slice of the feeds and the coordinator's cutoff;
+        # backfills pass a past window [cutoff_date, end_date)
+        self.rss_feeds = config.RSS_FEEDS if rss_feeds is None else rss_feeds
         self.arxiv_query = config.ARXIV_QUERY
-        # Calculate lookback window based on day of week
-        lookback_hours = _get_lookback_hours()
-        self.cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=lookback_hours)
+        self.end_date = end_date
+        now = end_date or datetime.datetime.now(datetime.timezone.utc)
+        if cutoff_date is None:
+            # Calculate lookback window based on day of week
+            cutoff_date = now - datetime.timedelta(hours=_get_lookback_hours(now))
+        self.cutoff_date = cutoff_date
+        if end_date is not None:
+            # ArXiv's newest results are far past the window, so ask for the window directly
+            self.arxiv_query = (f"({self.arxiv_query}) AND submittedDate:"
+                                f"[{cutoff_date:%Y%m%d%H%M} TO {end_date:%Y%m%d%H%M}]")
+        lookback_hours = round((now - cutoff_date).total_seconds() / 3600)
+        self.sem = asyncio.Semaphore(config.RSS_FETCH_CONCURRENCY)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/xml,application/xml,application/atom+xml,application/rss+xml,text/html;q=0.9,text/plain;q=0.8,image/png,*/*;q=0.5'
         }
         print(f"[Fetcher] Lookback: {lookback_hours}h | Cutoff: {self.cutoff_date.isoformat()} | RSS feeds: {len(self.rss_feeds)} | ArXiv query: {self.arxiv_query[:60]}...")
 
-    async def _fetch_single_rss_feed_with_retry(self, client: httpx.AsyncClient, url: str) -> List[Dict[str, Any]]:
+    def _in_window(self, published: datetime.datetime) -> bool:
+        return published > self.cutoff_date and (self.end_date is None or published <= self.end_date)
+
+    async def _fetch_single_rss_feed_with_retry(self, client: httpx.AsyncClient, url: str) -> List[Item]:
         """
         Fetches and parses a single RSS feed with retry logic and custom headers.
         """
+        # Bound in-flight feeds: thousands of queued requests stall httpx's connection pool
+        async with self.sem:
+            with metrics.span("feed.fetch", url=url) as span:
+                items = await self._fetch_rss_attempts(client, url, span)
+                span.set(items=len(items))
+                metrics.incr("feed_fetch_total", outcome="ok" if items else "empty_or_failed")
+                return items
+
+    async def _fetch_rss_attempts(self, client: httpx.AsyncClient, url: str, span) -> List[Item]:
         max_retries = 3
         for attempt in range(max_retries):
             try:
                 # Use httpx for parallel fetching with custom headers and optional SSL verification bypass
+                request_start = time.perf_counter()
                 response = await client.get(url, headers=self.headers, timeout=15.0, follow_redirects=True)
+                metrics.observe("feed_request_seconds", time.perf_counter() - request_start)
+                metrics.incr("feed_http_responses_total", status=response.status_code)
+                span.set(status=response.status_code, attempts=attempt + 1)
                 if response.status_code == 200:
                     rss_content = response.text
                 elif response.status_code == 403:
@@ -79,7 +109,13 @@ class Fetcher:
                 else:
                     raise Exception(f"HTTP Error {response.status_code}")
                 
+                content_bytes = len(rss_content.encode('utf-8'))
+                parse_start = time.perf_counter()
                 feed = feedparser.parse(rss_content)
+                parse_time = time.perf_counter() - parse_start
+                span.set(bytes=content_bytes, parse_time=round(parse_time, 6), entries=len(feed.entries))
+                metrics.observe("feed_bytes", content_bytes, metrics.BYTES_BUCKETS)
+                metrics.observe("feed_parse_seconds", parse_time)
                 
                 # Check for parsing errors, but allow one more attempt if it's not the last one
                 if feed.bozo and attempt < max_retries - 1:
@@ -99,15 +135,15 @@ class Fetcher:
                          pub_date = datetime.datetime(*entry.updated_parsed[:6], tzinfo=datetime.timezone.utc)
                     
                     # Filter by date
-                    if pub_date and pub_date > self.cutoff_date:
-                        items.append({
-                            "title": getattr(entry, 'title', 'No Title'),
-                            "link": getattr(entry, 'link', url),
-                            "summary": getattr(entry, 'summary', '') or getattr(entry, 'description', ''),
-                            "source": feed.feed.title if hasattr(feed, 'feed') and hasattr(feed.feed, 'title') else url,
-                            "published": pub_date.isoformat(),
-                            "type": "blog"
-                        })
+                    if pub_date and self._in_window(pub_date):
+                        items.append(Item(
+                            title=getattr(entry, 'title', 'No Title'),
+                            link=getattr(entry, 'link', url),
+                            summary=getattr(entry, 'summary', '') or getattr(entry, 'description', ''),
+                            source=feed.feed.title if hasattr(feed, 'feed') and hasattr(feed.feed, 'title') else url,
+                            published=pub_date.isoformat(),
+                            type="blog"
+                        ))
                     else:
                         filtered_count += 1
 
@@ -120,14 +156,16 @@ class Fetcher:
                     print(f"[Fetcher]   · {feed_name}: empty feed")
                 return items
             except Exception as e:
+                metrics.incr("feed_fetch_errors_total")
                 if attempt < max_retries - 1:
+                    metrics.incr("feed_fetch_retries_total")
                     print(f"[Fetcher]   ⚠ {url[:60]}... attempt {attempt+1} failed: {e}. Retrying...")
                     await asyncio.sleep(2 ** attempt)
                 else:
                     print(f"[Fetcher]   ✗ {url[:60]}... FAILED after {max_retries} attempts: {e}")
         return []
 
-    async def fetch_rss(self) -> List[Dict[str, Any]]:
+    async def fetch_rss(self) -> List[Item]:
         """Fetches and parses all configured RSS feeds in parallel."""
         print(f"[Fetcher] Fetching {len(self.rss_feeds)} RSS feeds in parallel...")
         # SSL verify=False for robustness against poor cert configurations (like Netflix sometimes)
@@ -140,18 +178,25 @@ class Fetcher:
             excluded = getattr(config, "EXCLUDED_SOURCE_DOMAINS", [])
             if excluded:
                 before = len(all_items)
-                all_items = [item for item in all_items if not any(d in (item.get("link") or "") for d in excluded)]
+                all_items = [item for item in all_items if not any(d in (item.link or "") for d in excluded)]
                 if len(all_items) < before:
                     print(f"[Fetcher] Excluded {before - len(all_items)} items from excluded domains: {excluded}")
             successful_feeds = sum(1 for r in results if r)
             print(f"[Fetcher] RSS complete: {len(all_items)} items from {successful_feeds}/{len(self.rss_feeds)} feeds")
             return all_items
 
-    def fetch_arxiv(self) -> List[Dict[str, Any]]:
+    def fetch_arxiv(self) -> List[Item]:
         """Fetches recent ArXiv papers matching the query."""
         print(f"[Fetcher] Fetching ArXiv papers (max {config.ARXIV_MAX_RESULTS})...")
+        with metrics.span("arxiv.fetch") as span:
+            papers = self._fetch_arxiv_results()
+            span.set(items=len(papers))
+            return papers
+
+    def _fetch_arxiv_results(self) -> List[Item]:
         try:
-            client = arxiv.Client()
+            client = arxiv.Client(delay_seconds=config.ARXIV_PAGE_DELAY_SECONDS)
+            client.query_url_format = config.ARXIV_API_URL + "?{}"
             search = arxiv.Search(
                 query=self.arxiv_query,
                 max_results=config.ARXIV_MAX_RESULTS,
@@ -162,22 +207,23 @@ class Fetcher:
             total_scanned = 0
             for result in client.results(search):
                 total_scanned += 1
-                if result.published > self.cutoff_date:
-                    papers.append({
-                        "title": result.title,
-                        "link": result.entry_id,
-                        "summary": result.summary,
-                        "source": "ArXiv",
-                        "published": result.published.isoformat(),
-                        "type": "paper"
-                    })
+                if self._in_window(result.published):
+                    papers.append(Item(
+                        title=result.title,
+                        link=result.entry_id,
+                        summary=result.summary,
+                        source="ArXiv",
+                        published=result.published.isoformat(),
+                        type="paper"
+                    ))
             print(f"[Fetcher] ArXiv complete: {len(papers)} papers within cutoff (scanned {total_scanned})")
             return papers
         except Exception as e:
+            metrics.incr("arxiv_fetch_errors_total")
             print(f"[Fetcher] ✗ ArXiv FAILED: {e}")
             return []
 
-    async def fetch_all(self) -> List[Dict[str, Any]]:
+    async def fetch_all(self) -> List[Item]:
         rss_data = await self.fetch_rss()
         # Arxiv library is synchronous
         arxiv_data = self.fetch_arxiv()
@@ -193,6 +239,6 @@ if __name__ == "__main__":
         items = await f.fetch_all()
         print(f"\nFetched {len(items)} items.")
         for item in items[:10]:
-            print(f"- [{item['type']}] {item['title']} ({item['source']})")
+            print(f"- [{item.type}] {item.title} ({item.source})")
     
     asyncio.run(test())
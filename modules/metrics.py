@@ -0,0 +1,210 @@
+# modules/metrics.py
+"""
+Lightweight tracing and metrics for pipeline runs.
+
+Disabled by default: every helper returns immediately (spans are a shared no-op object),
+so instrumented code costs one function call and a None check. Enable with
+`python orchestrator.py --metrics ...` or RESEARCH_AGENT_METRICS=1.
+"""
+import contextvars
+import datetime
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+# Cap on retained spans so the daemon's memory stays bounded
+MAX_SPANS = 10_000
+
+_registry = None
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, registry, name: str, attrs: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = 0.0
+        self.duration = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.name if parent else None
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = repr(exc)
+        self.registry.finish_span(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Registry:
+    def __init__(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.t0 = time.perf_counter()
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+
+    def finish_span(self, span: Span):
+        self.spans.append({
+            "name": span.name,
+            "parent": span.parent,
+            "start": round(span.start - self.t0, 6),
+            "duration": round(span.duration, 6),
+            "attrs": span.attrs,
+        })
+        self.observe(f"span_{span.name.replace('.', '_')}_seconds", span.duration, LATENCY_BUCKETS, {})
+
+    def incr(self, name: str, value: float, labels: Dict[str, Any]):
+        key = (name, _label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets, labels: Dict[str, Any]):
+        key = (name, _label_key(labels))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = {"buckets": buckets, "counts": [0] * len(buckets), "count": 0, "sum": 0.0}
+            self.histograms[key] = hist
+        hist["count"] += 1
+        hist["sum"] += value
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist["counts"][i] += 1
+
+    def report(self) -> Dict[str, Any]:
+        stages = {s["name"]: s["duration"] for s in self.spans if s["name"].startswith("stage.")}
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration": round(time.perf_counter() - self.t0, 6),
+            "stages": stages,
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), "count": h["count"], "sum": round(h["sum"], 6)}
+                for (name, labels), h in sorted(self.histograms.items())
+            ],
+            "spans": list(self.spans),
+        }
+
+    def prometheus_text(self) -> str:
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f"research_agent_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{fmt_labels(labels)} {value}")
+        for (name, labels), h in sorted(self.histograms.items()):
+            metric = f"research_agent_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, count in zip(h["buckets"], h["counts"]):
+                lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', '+Inf')])} {h['count']}")
+            lines.append(f"{metric}_sum{fmt_labels(labels)} {h['sum']}")
+            lines.append(f"{metric}_count{fmt_labels(labels)} {h['count']}")
+        lines.append("# TYPE research_agent_run_duration_seconds gauge")
+        lines.append(f"research_agent_run_duration_seconds {time.perf_counter() - self.t0}")
+        return "\n".join(lines) + "\n"
+
+
+def enable():
+    global _registry
+    if _registry is None:
+        _registry = Registry()
+
+
+def enabled() -> bool:
+    return _registry is not None
+
+
+def span(name: str, **attrs):
+    """Context manager timing a block. Use span.set(...) to attach attributes."""
+    if _registry is None:
+        return _NULL_SPAN
+    return Span(_registry, name, attrs)
+
+
+def incr(name: str, value: float = 1, **labels):
+    if _registry is None:
+        return
+    _registry.incr(name, value, labels)
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+    if _registry is None:
+        return
+    _registry.observe(name, value, buckets, labels)
+
+
+def _atomic_write(path: str, content: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def export(json_path: str = None, prom_path: str = None):
+    """Writes the JSON run report and/or the Prometheus textfile (node_exporter textfile collector)."""
+    if _registry is None:
+        return
+    if json_path:
+        _atomic_write(json_path, json.dumps(_registry.report(), indent=2, default=str))
+        print(f"[Metrics] Run report saved to {json_path}")
+    if prom_path:
+        _atomic_write(prom_path, _registry.prometheus_text())
+        print(f"[Metrics] Prometheus metrics saved to {prom_path}")
+    stages = _registry.report()["stages"]
+    if stages:
+        print("[Metrics] " + " | ".join(f"{name[len('stage.'):]}: {duration:.2f}s" for name, duration in stages.items()))
@@ -0,0 +1,175 @@
+# modules/models.py
+"""
+Typed, slotted item model shared by every pipeline stage.
+
+Items serialize to exactly the dict layout used by backlog.json and logs/*.json
+(`to_dict` / `from_dict`), so existing files keep loading. Unknown keys are carried
+in `extra` so nothing is lost on a round trip.
+"""
+import hashlib
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def item_id(link: str) -> int:
+    """Stable 64-bit ID for a link (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b((link or "").encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ProcessedResult:
+    """Gemini's analysis of an item plus the render-time fields the Designer derives from it."""
+
+    FIELDS = ("summary", "key_results", "relevance_score", "signal_type", "one_sentence_takeaway",
+              "lead_institution", "tags")
+    RENDER_FIELDS = ("summary_html", "summary_clean", "takeaway_clean", "takeaway_html")
+    __slots__ = FIELDS + RENDER_FIELDS + ("extra",)
+
+    def __init__(self, summary: str = "", key_results: List[str] = None, relevance_score: int = 0,
+                 signal_type: str = None, one_sentence_takeaway: str = "", lead_institution: str = None,
+                 tags: List[str] = None, extra: Dict[str, Any] = None):
+        self.summary = summary or ""
+        self.key_results = key_results or []
+        self.relevance_score = relevance_score
+        self.signal_type = _intern(signal_type)
+        self.one_sentence_takeaway = one_sentence_takeaway or ""
+        self.lead_institution = _intern(lead_institution)
+        self.tags = tags or []
+        self.summary_html = None
+        self.summary_clean = None
+        self.takeaway_clean = None
+        self.takeaway_html = None
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "ProcessedResult":
+        """Normalizes whatever the LLM (or an old log) produced: lists, non-dicts, string scores."""
+        if isinstance(data, ProcessedResult):
+            return data
+        if isinstance(data, list) and len(data) > 0:
+            data = data[0]
+        if not isinstance(data, dict):
+            data = {}
+
+        try:
+            score = int(data.get("relevance_score", 0) or 0)
+        except (TypeError, ValueError):
+            score = 0
+
+        result = cls(
+            summary=data.get("summary", ""),
+            key_results=data.get("key_results") or [],
+            relevance_score=score,
+            signal_type=data.get("signal_type"),
+            one_sentence_takeaway=data.get("one_sentence_takeaway", ""),
+            lead_institution=data.get("lead_institution"),
+            tags=data.get("tags") or [],
+            extra={k: v for k, v in data.items() if k not in cls.__slots__},
+        )
+        for name in cls.RENDER_FIELDS:
+            if data.get(name) is not None:
+                setattr(result, name, data[name])
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+        for name in self.RENDER_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        data.update(self.extra)
+        return data
+
+
+class Item:
+    """A fetched article or paper. Identity (==, hash) is the stable ID of its link."""
+
+    FIELDS = ("title", "link", "summary", "source", "published", "type", "display_category", "full_text", "related")
+    __slots__ = FIELDS + ("id", "processed", "extra")
+
+    def __init__(self, title: str, link: str, summary: str = "", source: str = None, published: str = None,
+                 type: str = "blog", display_category: str = None, full_text: str = None,
+                 related: List[Dict[str, Any]] = None, processed: ProcessedResult = None,
+                 extra: Dict[str, Any] = None):
+        self.title = title
+        self.link = link
+        self.summary = summary or ""
+        self.source = _intern(source)
+        self.published = published
+        self.type = _intern(type)
+        self.display_category = _intern(display_category)
+        # Article text fetched by the Enricher when the feed summary is too thin
+        self.full_text = full_text
+        # Similar earlier items from the RelatedIndex: [{"title", "link", "date", "similarity"}]
+        self.related = related
+        self.processed = processed
+        self.extra = extra or {}
+        self.id = item_id(link)
+
+    def __eq__(self, other):
+        return isinstance(other, Item) and self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+    def __repr__(self):
+        return f"Item(id={self.id}, title={self.title!r})"
+
+    @property
+    def score(self) -> int:
+        return self.processed.relevance_score if self.processed else 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Item":
+        if isinstance(data, Item):
+            return data
+        processed = data.get("processed")
+        return cls(
+            title=data.get("title", "No Title"),
+            link=data.get("link"),
+            summary=data.get("summary", ""),
+            source=data.get("source"),
+            published=data.get("published"),
+            type=data.get("type", "blog"),
+            display_category=data.get("display_category"),
+            full_text=data.get("full_text"),
+            related=data.get("related"),
+            processed=ProcessedResult.from_dict(processed) if processed is not None else None,
+            extra={k: v for k, v in data.items() if k not in cls.FIELDS and k != "processed"},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+        if self.processed is not None:
+            # Article text only feeds the Processor prompt; keep it out of the backlog and later logs
+            data.pop("full_text", None)
+            data["processed"] = self.processed.to_dict()
+        data.update(self.extra)
+        return data
+
+
+def items_from_dicts(records: Iterable[Any]) -> List[Item]:
+    """Loads items from backlog/log records, skipping malformed entries."""
+    return [Item.from_dict(r) for r in records if isinstance(r, Item) or (isinstance(r, dict) and r.get("link"))]
+
+
+CURATED_ITEM_KEYS = ("detailed_items", "signals", "items", "trending")
+
+
+def curated_from_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuilds Items inside a logged Curator result (logs/digest_*.json)."""
+    curated = dict(data)
+    for key in CURATED_ITEM_KEYS:
+        if isinstance(curated.get(key), list):
+            curated[key] = items_from_dicts(curated[key])
+    return curated
+
+
+def json_default(obj: Any):
+    """`json.dump(..., default=json_default)` writes Items in the backlog/log layout."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return str(obj)
@@ -0,0 +1,359 @@
+# modules/optimizer.py
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import List, Dict, Tuple
+from . import config
+
+# Elements that never have a closing tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Elements whose text content must be kept verbatim
+RAW_TEXT_TAGS = {"pre", "textarea", "script"}
+# Whitespace next to these never renders, so it can be dropped; between inline elements it is kept
+BLOCK_LEVEL_TAGS = {
+    "html", "head", "body", "title", "meta", "link", "style", "div", "p", "table", "thead", "tbody",
+    "tfoot", "tr", "td", "th", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+    "section", "header", "footer", "article", "blockquote", "pre", "center",
+}
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+WHITESPACE = re.compile(r'\s+')
+
+
+def _escape_attr(value: str) -> str:
+    # Only '&' and '"' need escaping inside a double-quoted attribute
+    return value.replace('&', '&amp;').replace('"', '&quot;')
+
+
+def _split_declarations(text: str) -> List[str]:
+    """Splits a declaration block on ';' outside quotes and parentheses (e.g. url("data:...;base64,..."))."""
+    parts, current, quote, depth = [], [], None, 0
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif char == ';' and not depth:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _parse_declarations(text: str) -> List[Tuple[str, str]]:
+    declarations = []
+    for decl in _split_declarations(text):
+        if ':' not in decl:
+            continue
+        prop, value = decl.split(':', 1)
+        prop, value = prop.strip().lower(), WHITESPACE.sub(' ', value.strip())
+        if prop and value:
+            declarations.append((prop, value))
+    return declarations
+
+
+def _overlaps(prop: str, other: str) -> bool:
+    """True if setting one property can set the other (same property, or shorthand and longhand)."""
+    return prop == other or prop.startswith(other + '-') or other.startswith(prop + '-')
+
+
+def _leftover_rule(selector: str, declarations: List[Tuple[str, str]], inlined: frozenset) -> str:
+    """
+    Serializes a rule kept in <style>. Declarations whose property (or its shorthand/longhand)
+    is also inlined get !important, or the style attribute would override them (e.g. .item:last-child).
+    """
+    body = []
+    for prop, value in declarations:
+        if '!important' not in value.lower() and any(_overlaps(prop, other) for other in inlined):
+            value += ' !important'
+        body.append(f"{prop}:{value}")
+    return f"{WHITESPACE.sub(' ', selector.strip())}{{{';'.join(body)}}}"
+
+
+def _merge_declarations(*groups: List[Tuple[str, str]]) -> str:
+    """Merges declaration lists (later wins), dropping repeated properties."""
+    merged = {}
+    for group in groups:
+        for prop, value in group:
+            # Keep dict ordering stable but move overridden properties to the end
+            merged.pop(prop, None)
+            merged[prop] = value
+    return ';'.join(f"{prop}:{value}" for prop, value in merged.items())
+
+
+def _parse_compound(part: str):
+    """'.a', 'li', 'h1.title' -> (tag or None, frozenset of classes). None if unsupported."""
+    match = re.fullmatch(r'([a-zA-Z][a-zA-Z0-9]*)?((?:\.[\w-]+)*)', part)
+    if not match or not part:
+        return None
+    tag = match.group(1).lower() if match.group(1) else None
+    classes = frozenset(c for c in match.group(2).split('.') if c)
+    return tag, classes
+
+
+@lru_cache(maxsize=8)
+def compile_stylesheet(css: str) -> Tuple[tuple, str]:
+    """
+    Splits a stylesheet into rules that can be inlined and leftover CSS that must stay in <style>
+    (pseudo-classes, @media, combinators). Cached so each template build is only parsed once.
+    """
+    css = CSS_COMMENT.sub('', css)
+    inline_rules = []
+    kept_rules = []  # (selectors, declarations)
+    at_rules = []  # (prelude, [(selectors, declarations)] or raw block text)
+    order = 0
+
+    # Pull out at-rule blocks (e.g. @media) so their rules are never inlined
+    def keep_at_rule(match):
+        block = match.group(0)
+        if block.startswith('@media'):
+            prelude, inner = block.split('{', 1)
+            at_rules.append((prelude, [(sel, _parse_declarations(body)) for sel, body in CSS_RULE.findall(inner)]))
+        else:
+            at_rules.append((None, block))
+        return ''
+    css = re.sub(r'@[^{]+\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}', keep_at_rule, css)
+
+    for selectors, body in CSS_RULE.findall(css):
+        declarations = _parse_declarations(body)
+        kept_selectors = []
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            parts = selector.split()
+            compiled = [_parse_compound(p) for p in parts]
+            if not parts or any(c is None for c in compiled):
+                kept_selectors.append(selector)
+                continue
+            specificity = (sum(len(c[1]) for c in compiled), sum(1 for c in compiled if c[0]))
+            inline_rules.append((specificity, order, tuple(compiled), tuple(declarations)))
+            order += 1
+        if kept_selectors:
+            kept_rules.append((','.join(kept_selectors), declarations))
+
+    inlined = frozenset(prop for rule in inline_rules for prop, _ in rule[3])
+    leftover = []
+    for prelude, content in at_rules:
+        if prelude is None:
+            leftover.append(WHITESPACE.sub(' ', content.strip()))
+        else:
+            rules = ''.join(_leftover_rule(sel, decls, inlined) for sel, decls in content)
+            leftover.append(f"{WHITESPACE.sub(' ', prelude.strip())}{{{rules}}}")
+    leftover.extend(_leftover_rule(sel, decls, inlined) for sel, decls in kept_rules)
+
+    inline_rules.sort(key=lambda r: (r[0], r[1]))
+    return tuple(inline_rules), ''.join(leftover)
+
+
+def _matches(compiled: tuple, stack: List[Tuple[str, frozenset]]) -> bool:
+    """Checks a descendant selector against the current element (stack[-1]) and its ancestors."""
+    (tag, classes), ancestors = compiled[-1], compiled[:-1]
+    el_tag, el_classes = stack[-1]
+    if (tag and tag != el_tag) or not classes <= el_classes:
+        return False
+    idx = len(stack) - 2
+    for anc_tag, anc_classes in reversed(ancestors):
+        while idx >= 0:
+            s_tag, s_classes = stack[idx]
+            idx -= 1
+            if (not anc_tag or anc_tag == s_tag) and anc_classes <= s_classes:
+                break
+        else:
+            return False
+    return True
+
+
+class _InlineRewriter(HTMLParser):
+    """Streams the document back out with CSS inlined and whitespace collapsed."""
+
+    def __init__(self, rules: tuple, leftover_css: str):
+        super().__init__(convert_charrefs=False)
+        self.rules = rules
+        self.leftover_css = leftover_css
+        self.out = []
+        self.stack = []
+        self.raw_depth = 0
+        self.in_style = False
+        self.style_cache: Dict[tuple, str] = {}
+        # Whitespace seen since the last output, and whether that output was block-level
+        self.pending_space = False
+        self.after_block = True
+
+    def _write(self, chunk: str, block: bool = False):
+        if self.pending_space and not block and not self.after_block:
+            self.out.append(' ')
+        self.pending_space = False
+        self.after_block = block
+        self.out.append(chunk)
+
+    def _style_for(self) -> str:
+        # Elements with the same tag/class path always get the same computed style
+        key = tuple(self.stack)
+        cached = self.style_cache.get(key)
+        if cached is None:
+            decls = []
+            for _spec, _order, compiled, declarations in self.rules:
+                if _matches(compiled, self.stack):
+                    decls.extend(declarations)
+            cached = _merge_declarations(decls)
+            self.style_cache[key] = cached
+        return cached
+
+    def _emit_tag(self, tag, attrs, self_closing=False):
+        classes = frozenset()
+        for name, value in attrs:
+            if name == 'class' and value:
+                classes = frozenset(value.split())
+        entry = (tag, classes)
+        if tag in VOID_TAGS or self_closing:
+            self.stack.append(entry)
+            computed = self._style_for()
+            self.stack.pop()
+        else:
+            self.stack.append(entry)
+            computed = self._style_for()
+
+        parts = [tag]
+        inline_existing = None
+        for name, value in attrs:
+            if name == 'style':
+                inline_existing = value or ''
+                continue
+            if value is None:
+                parts.append(name)
+            else:
+                parts.append(f'{name}="{_escape_attr(value)}"')
+        if computed or inline_existing:
+            # Inline style attributes already on the element win over stylesheet rules
+            style = _merge_declarations(_parse_declarations(computed), _parse_declarations(inline_existing or ''))
+            if style:
+                parts.append(f'style="{_escape_attr(style)}"')
+        self._write('<' + ' '.join(parts) + ('/>' if self_closing else '>'), tag in BLOCK_LEVEL_TAGS)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'style':
+            self.in_style = True
+            self._write('<style>', block=True)
+            self.stack.append((tag, frozenset()))
+            return
+        self._emit_tag(tag, attrs)
+        if tag in RAW_TEXT_TAGS:
+            self.raw_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._emit_tag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+            if self.leftover_css:
+                self._write(self.leftover_css + '</style>', block=True)
+            elif self.out and self.out[-1] == '<style>':
+                # Everything was inlined, drop the empty <style> block
+                self.out.pop()
+        elif tag in RAW_TEXT_TAGS and self.raw_depth:
+            self.raw_depth -= 1
+        if tag in VOID_TAGS:
+            return
+        if tag != 'style':
+            self._write(f'</{tag}>', tag in BLOCK_LEVEL_TAGS)
+        # Pop up to the matching open tag to tolerate sloppy LLM-generated HTML
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if self.in_style:
+            # Stylesheet was already compiled from the original source
+            return
+        if self.raw_depth:
+            self._write(data)
+            return
+        collapsed = WHITESPACE.sub(' ', data)
+        if not collapsed.strip():
+            # Decided by the next output: a single space unless a block-level tag is on either side
+            self.pending_space = self.pending_space or bool(collapsed)
+            return
+        if collapsed.startswith(' '):
+            self.pending_space = True
+            collapsed = collapsed[1:]
+        trailing = collapsed.endswith(' ')
+        self._write(collapsed.rstrip(' ') if trailing else collapsed)
+        self.pending_space = trailing
+
+    def handle_entityref(self, name):
+        self._write(f'&{name};')
+
+    def handle_charref(self, name):
+        self._write(f'&#{name};')
+
+    def handle_comment(self, data):
+        # Keep conditional comments for Outlook, drop everything else
+        if data.startswith('[if') or data.startswith('<![endif'):
+            self._write(f'<!--{data}-->', block=True)
+
+    def handle_decl(self, decl):
+        self._write(f'<!{decl}>', block=True)
+
+
+class PayloadOptimizer:
+    def __init__(self, size_budget: int = None):
+        self.size_budget = size_budget if size_budget is not None else config.EMAIL_SIZE_BUDGET_BYTES
+
+    def optimize(self, html_content: str) -> str:
+        """Inlines the <style> block, minifies whitespace and strips comments."""
+        css = ''.join(re.findall(r'<style[^>]*>(.*?)</style>', html_content, flags=re.S | re.I))
+        rules, leftover_css = compile_stylesheet(css)
+        rewriter = _InlineRewriter(rules, leftover_css)
+        rewriter.feed(html_content)
+        rewriter.close()
+        return ''.join(rewriter.out).strip()
+
+    def build(self, designer, context: dict) -> Tuple[str, dict]:
+        """
+        Renders the HTML from a prepared Designer context, optimizes the payload and trims
+        signals until the message fits the size budget (Gmail clips messages over ~102KB).
+        Returns the HTML and the context it was rendered from, so other formats can match it.
+        The number of signals kept is binary-searched: O(log n) renders instead of one per signal.
+        """
+        signals = list(context.get('signals', []))
+        raw_size = None
+
+        def attempt(count: int) -> Tuple[str, dict, int]:
+            nonlocal raw_size
+            trial = {**context, 'signals': signals[:count]}
+            rendered = designer.render_format(trial, "html")
+            if raw_size is None:
+                raw_size = len(rendered.encode('utf-8'))
+            optimized = self.optimize(rendered)
+            return optimized, trial, len(optimized.encode('utf-8'))
+
+        optimized, trial, size = attempt(len(signals))
+        if size > self.size_budget and signals:
+            # Largest signal count that fits (the size grows with the count)
+            fit, lo, hi = None, 0, len(signals) - 1
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                result = attempt(mid)
+                if result[2] <= self.size_budget:
+                    fit, lo = result, mid + 1
+                else:
+                    hi = mid - 1
+            # Nothing fits: send the payload without signals
+            optimized, trial, size = fit or attempt(0)
+        trimmed = len(signals) - len(trial['signals'])
+
+        print(f"[Optimizer] Payload: {raw_size / 1024:.1f}KB rendered -> {size / 1024:.1f}KB optimized ({size} bytes, budget {self.size_budget})")
+        if trimmed:
+            print(f"[Optimizer] Trimmed {trimmed} signals to fit the size budget")
+        if size > self.size_budget:
+            print("[Optimizer] ⚠ Payload still exceeds budget with no signals left to trim")
+        return optimized, trial
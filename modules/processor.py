@@ -2,6 +2,7 @@ import asyncio
 import os
 import json
 import re
+import time
 try:
     from google import genai
 except ImportError:
@@ -9,21 +10,37 @@ except ImportError:
         import google.genai as genai
     except ImportError:
         raise ImportError("Could not find 'google-genai' package. Please run: pip install google-genai")
-from typing import Dict, Any, List
+from typing import List
 from . import config
+from . import metrics
+from .models import Item, ProcessedResult
 
 class Processor:
-    def __init__(self):
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        self.client = genai.Client(api_key=api_key)
+    def __init__(self, client=None, max_concurrency: int = 5):
+        if client is None:
+            api_key = os.environ.get("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY environment variable not set")
+            client = genai.Client(api_key=api_key)
+        # Any object exposing `aio.models.generate_content` works (e.g. the benchmark's fake backend)
+        self.client = client
         # Correct model ID
         self.model_name = "gemini-3-flash-preview" 
         # Add a semaphore to limit concurrent API calls
-        self.sem = asyncio.Semaphore(5)
+        self.sem = asyncio.Semaphore(max_concurrency)
         self.max_retries = 3 
 
+    def _record_call(self, kind: str, started: float, response=None, outcome: str = "ok"):
+        """Records latency, outcome and token usage for one Gemini call."""
+        if not metrics.enabled():
+            return
+        metrics.observe("llm_call_seconds", time.perf_counter() - started, kind=kind)
+        metrics.incr("llm_calls_total", kind=kind, outcome=outcome)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            metrics.incr("llm_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, kind=kind, direction="input")
+            metrics.incr("llm_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, kind=kind, direction="output")
+
     def _repair_json(self, text: str) -> str:
         """
         Fixes common AI JSON errors: trailing commas and improper LaTeX escapes.
@@ -40,24 +57,26 @@ class Processor:
         
         return text
 
-    async def process_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_item(self, item: Item) -> Item:
         """
         Sends the item content/summary to Gemini for scoring and summarization (Async).
         """
-        is_repo = "github.com" in item.get('link', '').lower()
+        is_repo = "github.com" in (item.link or '').lower()
         if is_repo:
-            item['type'] = 'repo'
-            item['display_category'] = "Top Repo"
-        elif item.get('type') == 'paper':
-            item['display_category'] = "Top Paper"
-        elif item.get('type') == 'video':
-            item['display_category'] = "Top Video"
+            item.type = 'repo'
+            item.display_category = "Top Repo"
+        elif item.type == 'paper':
+            item.display_category = "Top Paper"
+        elif item.type == 'video':
+            item.display_category = "Top Video"
         else:
             # Default RSS/Blogs to Top News for a cleaner look, or Top Blog if preferred.
             # AlphaSignal often uses "Top News".
-            item['display_category'] = "Top News"
+            item.display_category = "Top News"
 
-        raw_summary = item.get('summary', '')
+        raw_summary = item.summary
+        if item.full_text:
+            raw_summary = f"{raw_summary}\n\nArticle text:\n{item.full_text}"
         # Pre-process ArXiv math: Replace single backslashes in input to prevent AI from mimicking them.
         sanitized_summary = raw_summary.replace("\\", " ")
 
@@ -66,8 +85,8 @@ class Processor:
         Analyze the following article/paper and extract key information.
         Interests: {", ".join(config.USER_INTERESTS)}.
 
-        Title: {item.get('title')}
-        Source: {item.get('source')}
+        Title: {item.title}
+        Source: {item.source}
         Content: {sanitized_summary}
 
         Please provide a JSON response with:
@@ -93,8 +112,15 @@ class Processor:
         5. PENALIZE PROMOTIONAL CONTENT: If the content is an event announcement, webinar, sales pitch, or a simple "join us" call to action, set relevance_score to 1-3. We want technical depth, not ads.
         """
 
+        with metrics.span("llm.process_item", title=item.title) as span:
+            return await self._process_with_retries(item, prompt, span)
+
+    async def _process_with_retries(self, item: Item, prompt: str, span) -> Item:
         async with self.sem:
             for attempt in range(self.max_retries):
+                span.set(attempts=attempt + 1)
+                started = time.perf_counter()
+                response = None
                 try:
                     # Use async client for parallel processing
                     response = await self.client.aio.models.generate_content(
@@ -107,45 +133,49 @@ class Processor:
                     
                     text = response.text.strip()
                     repaired_text = self._repair_json(text)
-                    result = json.loads(repaired_text)
+                    try:
+                        result = json.loads(repaired_text)
+                    except json.JSONDecodeError:
+                        metrics.incr("llm_parse_failures_total", kind="process_item")
+                        raise
+                    self._record_call("process_item", started, response)
                     
-                    if isinstance(result, list) and len(result) > 0:
-                        result = result[0]
-                    
-                    if not isinstance(result, dict):
-                        result = {}
-
-                    item['processed'] = result
+                    # from_dict unwraps list responses and drops non-dict output
+                    item.processed = ProcessedResult.from_dict(result)
                     return item
                     
                 except Exception as e:
+                    self._record_call("process_item", started, response, outcome="error")
                     if attempt < self.max_retries - 1:
+                        metrics.incr("llm_retries_total", kind="process_item")
                         await asyncio.sleep(2 ** attempt)  # Exponential backoff
                         continue
                     else:
-                         print(f"Error processing {item.get('title')}: {repr(e)}")
-                         item['processed'] = {
-                            "summary": f"Error processing content: {repr(e)}",
-                            "relevance_score": 0,
-                            "one_sentence_takeaway": "Error.",
-                            "tags": []
-                         }
+                         span.set(failed=True)
+                         print(f"Error processing {item.title}: {repr(e)}")
+                         item.processed = ProcessedResult(
+                            summary=f"Error processing content: {repr(e)}",
+                            relevance_score=0,
+                            one_sentence_takeaway="Error.",
+                            tags=[],
+                            extra={"error": repr(e)}
+                         )
                          return item
 
-    async def process_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def process_batch(self, items: List[Item]) -> List[Item]:
         """Processes a batch of items in parallel."""
         tasks = [self.process_item(item) for item in items]
         return await asyncio.gather(*tasks)
 
-    async def generate_global_summary(self, items: List[Dict[str, Any]]) -> str:
+    async def generate_global_summary(self, items: List[Item]) -> str:
         """Synthesizes a master summary from the top items (Async)."""
         if not items:
             return ""
         
         context_items = []
         for i in items[:8]:
-            title = i.get('title', 'Untitled')
-            takeaway = i.get('processed', {}).get('one_sentence_takeaway', 'No takeaway available')
+            title = i.title or 'Untitled'
+            takeaway = (i.processed.one_sentence_takeaway if i.processed else '') or 'No takeaway available'
             if title == 'Untitled':
                  print(f"Warning: Item missing title found in global summary generation: {i}")
             context_items.append(f"- {title}: {takeaway}")
@@ -160,26 +190,30 @@ class Processor:
         {context}
         """
 
+        started = time.perf_counter()
         try:
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
+            with metrics.span("llm.global_summary"):
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt
+                )
+            self._record_call("global_summary", started, response)
             return response.text.strip()
         except Exception as e:
+            self._record_call("global_summary", started, outcome="error")
             print(f"Error generating global summary: {e}")
             return "Breaking updates in RAG and Agentic systems continue to push the boundaries of LLM capabilities."
 
-    async def generate_trending_topics(self, items: List[Dict[str, Any]]) -> dict:
+    async def generate_trending_topics(self, items: List[Item]) -> dict:
         """Identifies trending themes and writes a personalized Saturday plan (Async)."""
         if not items:
             return {"plan_html": "<p>Relax and recharge! No major trends this week.</p>"}
 
         context_items = []
         for i in items[:20]:
-            title = i.get('title', 'Untitled')
-            summary = i.get('processed', {}).get('summary', 'No summary available')
-            link = i.get('link', '#')
+            title = i.title or 'Untitled'
+            summary = (i.processed.summary if i.processed else '') or 'No summary available'
+            link = i.link or '#'
             if title == 'Untitled':
                  print(f"Warning: Item missing title found in trending topics generation: {i}")    
             context_items.append(f"- {title} ({link}): {summary}")
@@ -244,13 +278,21 @@ class Processor:
         4. The "Weekly Trending Deep Dive" should be a multi-paragraph synthesis of the most significant trend.
         """
 
+        started = time.perf_counter()
+        response = None
         try:
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config={"response_mime_type": "application/json"}
-            )
-            return json.loads(response.text)
+            with metrics.span("llm.trending_topics"):
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config={"response_mime_type": "application/json"}
+                )
+            plan = json.loads(response.text)
+            self._record_call("trending_topics", started, response)
+            return plan
         except Exception as e:
+            if isinstance(e, json.JSONDecodeError):
+                metrics.incr("llm_parse_failures_total", kind="trending_topics")
+            self._record_call("trending_topics", started, response, outcome="error")
             print(f"Error generating Saturday plan: {e}")
             return {"plan_html": "<p>Could not generate plan due to an error.</p>"}
@@ -0,0 +1,286 @@
+# modules/related.py
+"""
+Persistent vector index of every processed item. It links new items to earlier coverage
+("previously covered" in the digest) and flags near-repeats, such as a follow-up post about
+the same release, so the Curator can down-weight them.
+
+Items are embedded locally as sparse TF-IDF vectors over hashed unigrams and bigrams (no API
+calls): the RELATED_MAX_TERMS highest-weighted terms, L2-normalized. Terms are not folded
+into a small dense space, so unrelated items score near zero instead of sharing collision
+noise.
+
+Vectors are stored as posting lists sorted by term, in segments: each append writes one, and
+the newest segments are merged while they are of similar size, so there are only O(log n) of
+them. Queries binary-search the memory-mapped segments and only read the postings of their own
+terms; nothing is loaded or sorted at startup, and per-row metadata is memory-mapped too.
+
+Files in RELATED_INDEX_DIR:
+  <segment>.terms / .rows / .weights  term hash (u32), row (u32) and weight (f32) per posting
+  ids.u64 / dates.u32 / offsets.u64   item ID, date (YYYYMMDD) and meta.jsonl line offset per row
+  meta.jsonl   one {"id", "title", "link", "date"} line per row, only read for matches
+  df.npy       document frequency per hashed term, for IDF
+  index.json   {"format", "rows", "meta_bytes", "segments": [{"name", "entries"}]}; written last,
+               it commits an append (anything past "rows" / "meta_bytes" is a crashed append)
+"""
+import json
+import os
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from . import config
+from .models import Item
+
+INDEX_FORMAT = "segments"
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its new of on or our that the this "
+    "to was we were will with via using how what why".split()
+)
+DF_BUCKETS = 1 << 20  # Document frequencies are counted per term hash modulo this
+MERGE_RATIO = 2  # Merge the newest segment into the previous one while that is at most this much larger
+POSTING_FILES = (("terms", np.uint32), ("rows", np.uint32), ("weights", np.float32))
+ROW_FILES = (("ids", "ids.u64", np.uint64), ("dates", "dates.u32", np.uint32), ("offsets", "offsets.u64", np.uint64))
+
+
+def _date_number(date_str: str) -> int:
+    return int(date_str.replace("-", ""))
+
+
+def _terms(text: str) -> Dict[int, int]:
+    """Counts of hashed unigrams and bigrams."""
+    tokens = [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+    counts: Dict[int, int] = {}
+    for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        h = zlib.crc32(gram.encode("utf-8"))
+        counts[h] = counts.get(h, 0) + 1
+    return counts
+
+
+def item_text(item: Item) -> str:
+    processed = item.processed
+    parts = [item.title or "", item.title or ""]  # Titles count double
+    if processed:
+        parts += [processed.one_sentence_takeaway, processed.summary, " ".join(processed.key_results),
+                  " ".join(processed.tags)]
+    else:
+        parts.append(item.summary)
+    return " ".join(p for p in parts if p)
+
+
+def _merge_postings(old: Tuple[np.ndarray, ...], new: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+    """Merges two term-sorted posting arrays in linear time (old postings first for equal terms)."""
+    total = len(old[0]) + len(new[0])
+    new_positions = np.searchsorted(old[0], new[0], side="right") + np.arange(len(new[0]))
+    old_mask = np.ones(total, dtype=bool)
+    old_mask[new_positions] = False
+    merged = []
+    for old_values, new_values in zip(old, new):
+        values = np.empty(total, dtype=old_values.dtype)
+        values[new_positions] = new_values
+        values[old_mask] = old_values
+        merged.append(values)
+    return tuple(merged)
+
+
+class RelatedIndex:
+    def __init__(self, path: str = None, max_terms: int = None):
+        self.path = path or config.RELATED_INDEX_DIR
+        self.max_terms = max_terms or config.RELATED_MAX_TERMS
+        self.info_path = os.path.join(self.path, "index.json")
+        self.meta_path = os.path.join(self.path, "meta.jsonl")
+        self.df_path = os.path.join(self.path, "df.npy")
+        self.rows = 0
+        self.meta_bytes = 0
+        self.segments: List[dict] = []
+        self.df = np.zeros(DF_BUCKETS, dtype=np.int32)
+        self._open_segments = None
+        self._load()
+
+    def __len__(self):
+        return self.rows
+
+    def _load(self):
+        if os.path.exists(self.info_path):
+            with open(self.info_path, "r") as f:
+                info = json.load(f)
+            if info.get("format") != INDEX_FORMAT:
+                raise ValueError(f"{self.path} was built by an older version of the index; "
+                                 f"delete it or point RELATED_INDEX_DIR elsewhere to rebuild")
+            self.rows, self.meta_bytes, self.segments = info["rows"], info["meta_bytes"], info["segments"]
+        if os.path.exists(self.df_path):
+            # Read-only map; append() copies it before counting new items
+            self.df = np.load(self.df_path, mmap_mode="r")
+        self._map_rows()
+
+    def _map_rows(self):
+        # Only the committed rows are mapped, so a crashed append's leftovers are never read
+        for kind, filename, dtype in ROW_FILES:
+            values = np.zeros(0, dtype=dtype)
+            if self.rows:
+                values = np.memmap(os.path.join(self.path, filename), dtype=dtype, mode="r", shape=(self.rows,))
+            setattr(self, f"_{kind}", values)
+
+    def _row_meta(self, rows) -> List[dict]:
+        with open(self.meta_path, "rb") as f:
+            metas = []
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                metas.append(json.loads(f.readline()))
+            return metas
+
+    def _segment_path(self, name: str, kind: str) -> str:
+        return os.path.join(self.path, f"{name}.{kind}")
+
+    def _read_segment(self, segment: dict) -> Tuple[np.ndarray, ...]:
+        if not segment["entries"]:
+            return tuple(np.zeros(0, dtype=dtype) for _, dtype in POSTING_FILES)
+        return tuple(np.memmap(self._segment_path(segment["name"], kind), dtype=dtype, mode="r",
+                               shape=(segment["entries"],))
+                     for kind, dtype in POSTING_FILES)
+
+    def _write_segment(self, name: str, postings: Tuple[np.ndarray, ...]) -> dict:
+        for (kind, dtype), values in zip(POSTING_FILES, postings):
+            tmp_path = self._segment_path(name, kind) + ".tmp"
+            np.asarray(values, dtype=dtype).tofile(tmp_path)
+            os.replace(tmp_path, self._segment_path(name, kind))
+        return {"name": name, "entries": len(postings[0])}
+
+    def vectorize(self, item: Item) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted term hashes, weights): the top `max_terms` TF-IDF weights, L2-normalized."""
+        terms = _terms(item_text(item))
+        if not terms:
+            return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.float32)
+        hashes = np.fromiter(terms.keys(), dtype=np.uint32, count=len(terms))
+        tf = np.fromiter(terms.values(), dtype=np.float32, count=len(terms))
+        idf = np.log((self.rows + 1) / (1.0 + self.df[hashes % DF_BUCKETS])) + 1.0
+        weights = ((1.0 + np.log(tf)) * idf).astype(np.float32)
+        if len(weights) > self.max_terms:
+            top = np.argpartition(weights, -self.max_terms)[-self.max_terms:]
+            hashes, weights = hashes[top], weights[top]
+        order = np.argsort(hashes)
+        weights = weights[order]
+        return hashes[order], weights / np.linalg.norm(weights)
+
+    def _scores(self, terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Dot product of one query vector with every indexed row (0 for rows sharing no term)."""
+        rows, products = [], []
+        for post_terms, post_rows, post_weights in self._open_segments:
+            lo = np.searchsorted(post_terms, terms, side="left")
+            counts = np.searchsorted(post_terms, terms, side="right") - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Positions of every posting of every query term, without a Python loop
+            positions = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)
+            rows.append(post_rows[positions])
+            products.append(post_weights[positions] * np.repeat(weights, counts))
+        if not rows:
+            return np.zeros(self.rows, dtype=np.float64)
+        return np.bincount(np.concatenate(rows), weights=np.concatenate(products), minlength=self.rows)
+
+    def search(self, items: List[Item], top_k: int, before_date: str = None) -> List[List[dict]]:
+        """
+        Top-k most similar indexed items per query item (best first). The item itself (same
+        ID) and entries dated `before_date` or later are excluded.
+        """
+        results = [[] for _ in items]
+        if not self.rows or not items:
+            return results
+        if self._open_segments is None:
+            self._open_segments = [self._read_segment(segment) for segment in self.segments]
+        excluded = self._dates >= _date_number(before_date) if before_date is not None else None
+
+        for col, item in enumerate(items):
+            scores = self._scores(*self.vectorize(item))
+            scores[self._ids == np.uint64(item.id)] = 0.0
+            if excluded is not None:
+                scores[excluded] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            results[col] = [{**meta, "similarity": round(float(min(scores[row], 1.0)), 3)}
+                            for row, meta in zip(candidates, self._row_meta(candidates))]
+        return results
+
+    def annotate(self, items: List[Item], date_str: str):
+        """Sets `item.related` to earlier coverage above RELATED_MIN_SIMILARITY."""
+        matches = self.search(items, config.RELATED_TOP_K, before_date=date_str)
+        for item, related in zip(items, matches):
+            item.related = [
+                {"title": m["title"], "link": m["link"], "date": m["date"], "similarity": m["similarity"]}
+                for m in related if m["similarity"] >= config.RELATED_MIN_SIMILARITY
+            ]
+
+    def append(self, items: List[Item], date_str: str) -> int:
+        """
+        Adds items not indexed yet as a new segment. Every file is written before index.json,
+        so a crash leaves the previous index intact.
+        """
+        new_items = list({item.id: item for item in items
+                          if not (item.processed and "error" in item.processed.extra)}.values())
+        if new_items and self.rows:
+            indexed = np.isin(np.array([item.id for item in new_items], dtype=np.uint64), self._ids)
+            new_items = [item for item, known in zip(new_items, indexed) if not known]
+        if not new_items:
+            return 0
+
+        first_row = self.rows
+        vectors = [self.vectorize(item) for item in new_items]
+        terms = np.concatenate([t for t, _ in vectors])
+        order = np.argsort(terms, kind="stable")
+        rows = np.repeat(np.arange(first_row, first_row + len(vectors), dtype=np.uint32), [len(t) for t, _ in vectors])
+        postings = (terms[order], rows[order], np.concatenate([w for _, w in vectors])[order])
+
+        os.makedirs(self.path, exist_ok=True)
+        segments = list(self.segments)
+        name = f"{first_row:09d}-{first_row + len(new_items):09d}"
+        while segments and segments[-1]["entries"] <= MERGE_RATIO * len(postings[0]):
+            previous = segments.pop()
+            postings = _merge_postings(tuple(np.array(a) for a in self._read_segment(previous)), postings)
+            name = f"{previous['name'].split('-')[0]}-{name.split('-')[1]}"
+        segments.append(self._write_segment(name, postings))
+
+        # Row files and metadata: cut any crashed append's leftovers, then append
+        lines = [(json.dumps({"id": item.id, "title": item.title, "link": item.link, "date": date_str}) + "\n")
+                 .encode("utf-8") for item in new_items]
+        offsets = self.meta_bytes + np.cumsum([0] + [len(line) for line in lines[:-1]], dtype=np.uint64)
+        new_rows = {"ids": [item.id for item in new_items], "dates": [_date_number(date_str)] * len(new_items),
+                    "offsets": offsets}
+        for kind, filename, dtype in ROW_FILES:
+            with open(os.path.join(self.path, filename), "ab") as f:
+                f.truncate(first_row * np.dtype(dtype).itemsize)
+                f.write(np.asarray(new_rows[kind], dtype=dtype).tobytes())
+        with open(self.meta_path, "ab") as f:
+            f.truncate(self.meta_bytes)
+            f.write(b"".join(lines))
+        meta_bytes = self.meta_bytes + sum(len(line) for line in lines)
+
+        self.df = np.array(self.df)
+        for item in new_items:
+            hashes = np.fromiter(_terms(item_text(item)).keys(), dtype=np.uint32)
+            self.df[np.unique(hashes % DF_BUCKETS)] += 1
+        tmp_path = self.df_path + ".tmp.npy"
+        np.save(tmp_path, self.df)
+        os.replace(tmp_path, self.df_path)
+
+        tmp_path = self.info_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": INDEX_FORMAT, "rows": first_row + len(new_items), "meta_bytes": meta_bytes,
+                       "segments": segments}, f)
+        os.replace(tmp_path, self.info_path)
+
+        # Files of segments merged away are no longer referenced
+        live = {s["name"] for s in segments}
+        for old in self.segments:
+            if old["name"] not in live:
+                for kind, _ in POSTING_FILES:
+                    if os.path.exists(self._segment_path(old["name"], kind)):
+                        os.remove(self._segment_path(old["name"], kind))
+        self.rows, self.meta_bytes, self.segments = first_row + len(new_items), meta_bytes, segments
+        self._map_rows()
+        self._open_segments = None
+        return len(new_items)
@@ -0,0 +1,213 @@
+# modules/sharding.py
+"""
+Sharded ingestion: feeds and items are split into work units in a WorkQueue, claimed by
+any number of worker processes (local or on other machines sharing the queue file), and
+merged back in unit order so curation sees the same list no matter who did the work.
+
+A run goes through three phases:
+  fetch   - "feeds" units (a slice of RSS_FEEDS each) and one "arxiv" unit
+  process - "process" units (SHARD_ITEMS_PER_UNIT fetched items each)
+  done    - workers exit
+The coordinator enqueues each phase, works on it alongside the workers, and merges.
+"""
+import asyncio
+import datetime
+import multiprocessing
+import os
+import socket
+from typing import Callable, Dict, List
+
+from . import config
+from . import metrics
+from .models import Item, items_from_dicts
+from .workqueue import WorkQueue
+
+FETCH_KINDS = ("feeds", "arxiv")
+PROCESS_KINDS = ("process",)
+POLL_SECONDS = 0.5
+RUN_RETENTION_DAYS = 7
+
+
+def open_queue(path: str = None) -> WorkQueue:
+    return WorkQueue(
+        os.path.abspath(path or config.SHARD_QUEUE_FILE),
+        lease_seconds=config.SHARD_LEASE_SECONDS,
+        max_attempts=config.SHARD_MAX_ATTEMPTS,
+        shared_storage=config.SHARD_SHARED_STORAGE,
+    )
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _chunks(values: List, size: int) -> List[List]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+async def _run_unit(unit: Dict, processor_factory: Callable, state: Dict):
+    from .fetcher import Fetcher
+
+    kind, payload = unit["kind"], unit["payload"]
+    if kind in FETCH_KINDS:
+        cutoff = datetime.datetime.fromisoformat(payload["cutoff"])
+        fetcher = Fetcher(rss_feeds=payload.get("feeds", []), cutoff_date=cutoff)
+        items = await fetcher.fetch_rss() if kind == "feeds" else fetcher.fetch_arxiv()
+        if kind == "feeds" and config.ENRICH_ENABLED:
+            from .enricher import Enricher
+            await Enricher().enrich(items)
+    elif kind == "process":
+        # One Processor (and Gemini client) per worker, created on the first process unit
+        if "processor" not in state:
+            if processor_factory is None:
+                from .processor import Processor
+                processor_factory = Processor
+            state["processor"] = processor_factory()
+        items = await state["processor"].process_batch(items_from_dicts(payload))
+    else:
+        raise ValueError(f"Unknown unit kind: {kind}")
+    return [item.to_dict() for item in items]
+
+
+async def work(queue: WorkQueue, run_id: str, worker_id: str, until: Callable[[], bool],
+               processor_factory: Callable = None):
+    """Claims and runs units of `run_id` until `until()` is true. Returns the number of units done."""
+    state = {}
+    done = 0
+    while True:
+        unit = queue.claim(run_id, worker_id)
+        if unit is None:
+            if until():
+                return done
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+
+        try:
+            with metrics.span("shard.unit", kind=unit["kind"], seq=unit["seq"]):
+                result = await _run_unit(unit, processor_factory, state)
+        except Exception as e:
+            print(f"[Shard] ✗ {worker_id} failed {unit['unit_id']}: {repr(e)}")
+            queue.fail(unit["unit_id"], worker_id, repr(e))
+            continue
+
+        if queue.complete(unit["unit_id"], worker_id, result):
+            done += 1
+        else:
+            print(f"[Shard] {worker_id} lost the lease on {unit['unit_id']}; result discarded")
+
+
+def _worker_process(queue_path: str, run_id: str, processor_factory: Callable = None,
+                    initializer: Callable = None):
+    """Entry point of a local worker process (multiprocessing, spawn start method)."""
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    if initializer:
+        initializer()
+
+    queue = open_queue(queue_path)
+    worker_id = worker_name()
+    try:
+        done = asyncio.run(work(queue, run_id, worker_id, until=lambda: queue.phase(run_id) == "done",
+                                processor_factory=processor_factory))
+        print(f"[Shard] Worker {worker_id} finished {done} units")
+    finally:
+        queue.close()
+
+
+async def run_worker(queue_path: str = None, run_id: str = None, processor_factory: Callable = None):
+    """
+    Standalone worker (`python orchestrator.py worker`), e.g. on another machine sharing the
+    queue file. Without a run ID it waits for the coordinator to start one.
+    """
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    queue = open_queue(queue_path)
+    worker_id = worker_name()
+    try:
+        while run_id is None:
+            run_id = queue.active_run()
+            if run_id is None:
+                await asyncio.sleep(POLL_SECONDS)
+        if queue.phase(run_id) is None:
+            print(f"[Shard] Unknown run {run_id} in {queue.path}")
+            return
+        print(f"[Shard] Worker {worker_id} joined run {run_id}")
+        done = await work(queue, run_id, worker_id, until=lambda: queue.phase(run_id) == "done",
+                          processor_factory=processor_factory)
+        print(f"[Shard] Worker {worker_id} finished {done} units")
+    finally:
+        queue.close()
+
+
+def _merge(queue: WorkQueue, run_id: str, kinds) -> List[Item]:
+    """Concatenates unit results in (kind, seq) order and drops duplicate links."""
+    items = []
+    seen = set()
+    for kind in kinds:
+        for failure in queue.failures(run_id, kind):
+            print(f"[Shard] ✗ Unit {failure['unit_id']} gave up: {failure['error']}")
+        for result in queue.results(run_id, kind):
+            for item in items_from_dicts(result):
+                if item.id not in seen:
+                    seen.add(item.id)
+                    items.append(item)
+    return items
+
+
+async def _run_phase(queue: WorkQueue, run_id: str, kinds, processor_factory: Callable) -> List[Item]:
+    def finished():
+        return all(queue.is_finished(run_id, kind) for kind in kinds)
+
+    # The coordinator is a worker too, so --workers 1 needs no extra process
+    await work(queue, run_id, worker_name(), until=finished, processor_factory=processor_factory)
+    return _merge(queue, run_id, kinds)
+
+
+async def sharded_ingest(workers: int, run_id: str = None, queue_path: str = None,
+                         processor_factory: Callable = None, initializer: Callable = None) -> List[Item]:
+    """
+    Coordinator: fetches and processes through the queue with `workers` local processes
+    (including this one) and returns processed items in the same order on every run.
+    Passing the ID of an interrupted run resumes it; finished units are not redone.
+    `processor_factory` and `initializer` must be picklable (they are sent to spawned workers).
+    """
+    queue = open_queue(queue_path)
+    queue.prune(RUN_RETENTION_DAYS * 86400)
+    run_id = run_id or datetime.datetime.now().strftime("%Y-%m-%dT%H%M%S")
+    queue.start_run(run_id)
+
+    from .fetcher import _get_lookback_hours
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=_get_lookback_hours())
+    feed_units = [{"feeds": feeds, "cutoff": cutoff.isoformat()}
+                  for feeds in _chunks(config.RSS_FEEDS, config.SHARD_FEEDS_PER_UNIT)]
+    queue.enqueue(run_id, "feeds", feed_units)
+    queue.enqueue(run_id, "arxiv", [{"cutoff": cutoff.isoformat()}])
+    print(f"[Shard] Run {run_id}: {len(feed_units)} feed units + 1 ArXiv unit, {workers} local workers, queue {queue.path}")
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_worker_process, args=(queue.path, run_id, processor_factory, initializer))
+             for _ in range(max(0, workers - 1))]
+    for proc in procs:
+        proc.start()
+
+    try:
+        print("Stage 1: Fetching content across workers...")
+        with metrics.span("stage.fetch") as span:
+            raw_items = await _run_phase(queue, run_id, FETCH_KINDS, processor_factory)
+            span.set(items=len(raw_items))
+        print(f"Fetched {len(raw_items)} items.")
+
+        queue.enqueue(run_id, "process", _chunks([item.to_dict() for item in raw_items], config.SHARD_ITEMS_PER_UNIT))
+        queue.set_phase(run_id, "process")
+        print("Stage 2: Processing content with Gemini across workers...")
+        with metrics.span("stage.process", items=len(raw_items)):
+            processed_items = await _run_phase(queue, run_id, PROCESS_KINDS, processor_factory)
+        print("Processing complete.")
+    finally:
+        queue.set_phase(run_id, "done")
+        for proc in procs:
+            proc.join()
+        queue.close()
+
+    return processed_items
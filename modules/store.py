@@ -0,0 +1,109 @@
+# modules/store.py
+import json
+import os
+import datetime
+from typing import List, Dict
+from . import config
+from .models import Item, items_from_dicts, json_default
+
+
+class ItemStore:
+    """
+    Persistent store of processed items waiting for the next digest (used by the daemon).
+    Tracks every link it has seen so polls only send genuinely new items to Gemini, and links
+    whose processing failed so they are retried with backoff, then given up on.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.PENDING_STORE_FILE
+        self.items: List[Item] = []
+        self.seen: Dict[str, str] = {}
+        self.failures: Dict[str, Dict] = {}  # link -> {"count", "last"} for failed processing attempts
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.items = items_from_dicts(data.get("items", []))
+            self.seen = data.get("seen", {})
+            self.failures = data.get("failures", {})
+
+    def save(self):
+        # Write to a temp file first so a crash mid-write never corrupts the store
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"items": self.items, "seen": self.seen, "failures": self.failures}, f, indent=2,
+                      default=json_default)
+        os.replace(tmp_path, self.path)
+
+    def _retry_due(self, link: str, now: datetime.datetime) -> bool:
+        failure = self.failures.get(link)
+        if failure is None:
+            return True
+        backoff = datetime.timedelta(minutes=config.PROCESS_RETRY_BACKOFF_MINUTES * 2 ** (failure["count"] - 1))
+        return now >= datetime.datetime.fromisoformat(failure["last"]) + backoff
+
+    def filter_new(self, items: List[Item]) -> List[Item]:
+        """
+        Returns items whose link has not been seen yet (deduplicated within the batch too),
+        skipping failed links until their retry backoff has passed.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        new_items = []
+        batch_links = set()
+        for item in items:
+            link = item.link
+            if link and link not in self.seen and link not in batch_links and self._retry_due(link, now):
+                new_items.append(item)
+                batch_links.add(link)
+        return new_items
+
+    def add(self, items: List[Item]) -> int:
+        """
+        Adds processed items. Gemini failures are left out and retried by later polls with
+        exponential backoff; after PROCESS_MAX_ATTEMPTS the link is marked seen and dropped.
+        Returns the number added.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        added = 0
+        for item in items:
+            if item.processed is None or "error" in item.processed.extra:
+                failure = self.failures.setdefault(item.link, {"count": 0})
+                failure["count"] += 1
+                failure["last"] = now
+                if failure["count"] >= config.PROCESS_MAX_ATTEMPTS:
+                    print(f"[Store] Giving up on {item.link} after {failure['count']} failed attempts")
+                    del self.failures[item.link]
+                    self.seen[item.link] = now
+                continue
+            self.failures.pop(item.link, None)
+            self.seen[item.link] = now
+            self.items.append(item)
+            added += 1
+        self.save()
+        return added
+
+    def pending(self) -> List[Item]:
+        """Returns the pending items without clearing them (see clear_pending)."""
+        return list(self.items)
+
+    def clear_pending(self, items: List[Item]):
+        """Drops items once their digest is built; seen links are kept for dedup."""
+        done = {item.id for item in items}
+        self.items = [item for item in self.items if item.id not in done]
+        self.prune_seen()
+        self.save()
+
+    def prune_seen(self, max_age_hours: int = None):
+        """Forgets links older than the longest fetch lookback, they can't be fetched again."""
+        max_age_hours = max_age_hours or config.SEEN_RETENTION_HOURS
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=max_age_hours)
+        self.seen = {
+            link: ts for link, ts in self.seen.items()
+            if datetime.datetime.fromisoformat(ts) > cutoff
+        }
+        self.failures = {
+            link: failure for link, failure in self.failures.items()
+            if datetime.datetime.fromisoformat(failure["last"]) > cutoff
+        }
@@ -0,0 +1,182 @@
+# modules/workqueue.py
+"""
+Lease-based work queue backed by a single SQLite file.
+
+Workers claim a unit by taking a time-limited lease. A worker that dies simply lets its
+lease expire, and the unit becomes claimable again (up to `max_attempts`). Every state
+change is a short IMMEDIATE transaction, so any number of processes can share the file.
+Pointing several machines at one file needs shared storage with working POSIX locks
+(e.g. NFSv4 with locking enabled).
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    phase TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    unit_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS units_by_run ON units (run_id, kind, status);
+"""
+
+
+class WorkQueue:
+    def __init__(self, path: str, lease_seconds: float = 600, max_attempts: int = 3, shared_storage: bool = False):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: we issue BEGIN IMMEDIATE ourselves for claim/complete
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # WAL is faster locally but relies on shared memory, which network filesystems lack
+        self.conn.execute("PRAGMA journal_mode=DELETE" if shared_storage else "PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # --- Run lifecycle -------------------------------------------------------------------
+
+    def start_run(self, run_id: str, phase: str = "fetch"):
+        """Creates the run, or resets the phase of an existing one being resumed (its units are kept)."""
+        with self._transaction():
+            self.conn.execute("INSERT INTO runs (run_id, phase, created) VALUES (?, ?, ?) "
+                              "ON CONFLICT (run_id) DO UPDATE SET phase = excluded.phase",
+                              (run_id, phase, time.time()))
+
+    def set_phase(self, run_id: str, phase: str):
+        with self._transaction():
+            self.conn.execute("UPDATE runs SET phase = ? WHERE run_id = ?", (phase, run_id))
+
+    def phase(self, run_id: str) -> Optional[str]:
+        row = self.conn.execute("SELECT phase FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def active_run(self) -> Optional[str]:
+        """Most recent run that hasn't finished, for workers started without a run ID."""
+        row = self.conn.execute("SELECT run_id FROM runs WHERE phase != 'done' ORDER BY created DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def prune(self, max_age_seconds: float):
+        """Deletes runs (and their units) created more than max_age_seconds ago."""
+        cutoff = time.time() - max_age_seconds
+        with self._transaction():
+            self.conn.execute("DELETE FROM units WHERE run_id IN (SELECT run_id FROM runs WHERE created < ?)", (cutoff,))
+            self.conn.execute("DELETE FROM runs WHERE created < ?", (cutoff,))
+
+    # --- Units ---------------------------------------------------------------------------
+
+    def enqueue(self, run_id: str, kind: str, payloads: List[Any]):
+        """Adds units in order. Idempotent: re-enqueueing a run resumes instead of duplicating."""
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO units (unit_id, run_id, kind, seq, payload) VALUES (?, ?, ?, ?, ?)",
+                [(f"{run_id}:{kind}:{seq}", run_id, kind, seq, json.dumps(payload))
+                 for seq, payload in enumerate(payloads)],
+            )
+
+    def claim(self, run_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Leases the next pending (or lease-expired) unit of the run, lowest seq first."""
+        now = time.time()
+        claimable = "run_id = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+        with self._transaction():
+            # Give up on every expired unit that is out of attempts first, so one of them
+            # can't hide the claimable units behind it
+            self.conn.execute(
+                "UPDATE units SET status = 'failed', error = COALESCE(error, 'lease expired'), "
+                f"lease_owner = NULL, lease_expires = NULL WHERE {claimable} AND attempts >= ?",
+                (run_id, now, self.max_attempts),
+            )
+            row = self.conn.execute(
+                f"SELECT unit_id, kind, seq, payload FROM units WHERE {claimable} ORDER BY kind, seq LIMIT 1",
+                (run_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            unit_id, kind, seq, payload = row
+            self.conn.execute(
+                "UPDATE units SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE unit_id = ?",
+                (worker_id, now + self.lease_seconds, unit_id),
+            )
+        return {"unit_id": unit_id, "kind": kind, "seq": seq, "payload": json.loads(payload)}
+
+    def complete(self, unit_id: str, worker_id: str, result: Any) -> bool:
+        """Stores the result. Ignored if the lease was lost to another worker meanwhile."""
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE units SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE unit_id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result), unit_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, unit_id: str, worker_id: str, error: str):
+        """Releases the unit for a retry, or marks it failed after max_attempts."""
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE unit_id = ? AND lease_owner = ?",
+                (self.max_attempts, error, unit_id, worker_id),
+            )
+
+    def counts(self, run_id: str, kind: str) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM units WHERE run_id = ? AND kind = ? GROUP BY status",
+                                 (run_id, kind)).fetchall()
+        return dict(rows)
+
+    def is_finished(self, run_id: str, kind: str) -> bool:
+        counts = self.counts(run_id, kind)
+        return counts.get("pending", 0) == 0 and counts.get("leased", 0) == 0
+
+    def results(self, run_id: str, kind: str) -> List[Any]:
+        """Results of completed units in seq order, so merges are deterministic."""
+        rows = self.conn.execute(
+            "SELECT result FROM units WHERE run_id = ? AND kind = ? AND status = 'done' ORDER BY seq",
+            (run_id, kind),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def failures(self, run_id: str, kind: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT unit_id, error FROM units WHERE run_id = ? AND kind = ? AND status = 'failed' ORDER BY seq",
+            (run_id, kind),
+        ).fetchall()
+        return [{"unit_id": unit_id, "error": error} for unit_id, error in rows]
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
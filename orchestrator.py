@@ -1,26 +1,33 @@
 # orchestrator.py
+import argparse
 import asyncio
 import datetime
 import os
-import os
 import sys
 import json
 import glob
-from modules.fetcher import Fetcher
-from modules.processor import Processor
-from modules.curator import Curator
-from modules.designer import Designer
+import shutil
+# Fetcher and Processor pull in httpx, feedparser, arxiv and google-genai, so they are
+# imported lazily inside the stages that need them. Render-only runs stay fast and keyless.
+from modules import config
+from modules import metrics
+from modules.curator import Curator, BACKLOG_FILE
+from modules.models import Item, items_from_dicts, curated_from_dict, json_default
+from modules.designer import Designer, OUTPUT_FILES
+from modules.optimizer import PayloadOptimizer
 
 LOG_DIR = "logs"
+STAGE_LOG_KINDS = ("fetched", "processed", "digest")
 
 def cleanup_old_logs(days=7):
     """Deletes log files older than 'days'."""
     if not os.path.exists(LOG_DIR):
         return
-    
+
     cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
-    # Pattern match for our log files
-    for log_file in glob.glob(os.path.join(LOG_DIR, "digest_*.json")):
+    # Stage outputs only: run_*.json metrics reports and anything else in logs/ are kept
+    stage_logs = [path for kind in STAGE_LOG_KINDS for path in glob.glob(os.path.join(LOG_DIR, f"{kind}_*.json"))]
+    for log_file in stage_logs:
         try:
             file_time = datetime.datetime.fromtimestamp(os.path.getmtime(log_file))
             if file_time < cutoff:
@@ -29,39 +36,166 @@ def cleanup_old_logs(days=7):
         except OSError as e:
             print(f"Error deleting {log_file}: {e}")
 
-def save_daily_log(data):
-    """Saves the curated data to a JSON log file."""
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
-    
-    date_str = datetime.datetime.now().strftime("%Y-%m-%d")
-    filename = f"digest_{date_str}.json"
-    filepath = os.path.join(LOG_DIR, filename)
-    
+def _log_path(kind, date_str=None, log_dir=None):
+    date_str = date_str or datetime.datetime.now().strftime("%Y-%m-%d")
+    return os.path.join(log_dir or LOG_DIR, f"{kind}_{date_str}.json")
+
+def save_stage_log(kind, data, date_str=None, log_dir=None):
+    """Saves a stage output (e.g. 'fetched', 'processed', 'digest') to a JSON log file."""
+    log_dir = log_dir or LOG_DIR
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    filepath = _log_path(kind, date_str, log_dir)
+
     try:
         with open(filepath, 'w') as f:
-            # Use default=str to handle datetime objects
-            json.dump(data, f, indent=2, default=str)
-        print(f"Daily log saved to {filepath}")
+            # Items serialize to the backlog/log dict layout, anything else (e.g. datetimes) to str
+            json.dump(data, f, indent=2, default=json_default)
+        print(f"Stage log saved to {filepath}")
     except Exception as e:
         print(f"Failed to save log: {e}")
 
-async def main():
+def latest_log_date(kind):
+    """Date of the most recent log of that kind."""
+    candidates = sorted(glob.glob(os.path.join(LOG_DIR, f"{kind}_*.json")))
+    if not candidates:
+        raise FileNotFoundError(f"No {kind} logs found in {LOG_DIR}/")
+    return os.path.basename(candidates[-1])[len(kind) + 1:-len(".json")]
+
+def load_stage_log(kind, date_str=None):
+    """Loads a stage output. Without a date, the most recent log of that kind is used."""
+    filepath = _log_path(kind, date_str or latest_log_date(kind))
+    print(f"Loading {kind} log from {filepath}")
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+def save_daily_log(data, date_str=None, log_dir=None):
+    """Saves the curated data to a JSON log file."""
+    save_stage_log("digest", data, date_str, log_dir)
+
+def is_weekend_today(now=None):
+    """Weekend by local time, or by the date of `now` (e.g. the daemon's UTC schedule clock)."""
+    weekday = (now or datetime.datetime.now()).weekday()
+    return weekday == 5 or weekday == 6
+
+def remove_stale_outputs():
+    """Removes digest outputs from a previous run to avoid sending stale content."""
+    for output_file in OUTPUT_FILES.values():
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+async def fetch_stage():
+    import urllib3
+    from modules.fetcher import Fetcher
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    print("Stage 1: Fetching content in parallel...")
+    with metrics.span("stage.fetch") as span:
+        fetcher = Fetcher()
+        raw_items = await fetcher.fetch_all()
+        span.set(items=len(raw_items))
+    print(f"Fetched {len(raw_items)} items.")
+    return raw_items
+
+async def enrich_stage(items):
+    """Fetches article text for entries whose feed summary is too thin to score (in place)."""
+    if not config.ENRICH_ENABLED or not items:
+        return items
+    from modules.enricher import Enricher
+
+    print("Stage 1b: Fetching full text for thin entries...")
+    with metrics.span("stage.enrich", items=len(items)):
+        await Enricher().enrich(items)
+    return items
+
+async def process_stage(processor, raw_items):
+    print("Stage 2: Processing content with Gemini in parallel...")
+    with metrics.span("stage.process", items=len(raw_items)):
+        processed_items = await processor.process_batch(raw_items)
+    print("Processing complete.")
+    return processed_items
+
+def relate_stage(processed_items, date_str=None):
+    """Links items to similar earlier coverage, then adds them to the related-coverage index."""
+    if not config.RELATED_INDEX_ENABLED or not processed_items:
+        return processed_items
+    from modules.related import RelatedIndex
+
+    date_str = date_str or datetime.datetime.now().strftime("%Y-%m-%d")
+    with metrics.span("stage.relate", items=len(processed_items)) as span:
+        index = RelatedIndex()
+        index.annotate([item for item in processed_items if item.related is None], date_str)
+        added = index.append(processed_items, date_str)
+        span.set(indexed=len(index))
+    repeats = sum(1 for item in processed_items
+                  if item.related and item.related[0]["similarity"] >= config.RELATED_REPEAT_SIMILARITY)
+    print(f"[Related] {repeats} near-repeats | indexed {added} new items ({len(index)} total)")
+    return processed_items
+
+def curate_stage(processed_items, is_weekend, curator=None):
+    """Curates items; the caller saves the digest log (once, with the summaries when there are any)."""
+    print("Stage 3: Curating content...")
+    with metrics.span("stage.curate", items=len(processed_items)):
+        curator = curator or Curator()
+        return curator.curate(processed_items, is_weekend=is_weekend)
+
+async def summary_stage(processor, curated_data, is_weekend):
+    # 4. Global Summary
+    print("Stage 4: Generating Global Summary...")
+    with metrics.span("stage.summary"):
+        global_summary = await processor.generate_global_summary(curated_data.get('detailed_items', []))
+
+    # 5. Saturday Special: Trending Deep Dive
+    trending_info = None
+    if is_weekend:
+        print("Stage 5: Generating Weekly Deep Dive...")
+        with metrics.span("stage.trending"):
+            trending_info = await processor.generate_trending_topics(curated_data.get('items', []))
+    return global_summary, trending_info
+
+def render_stage(curated_data, global_summary=None, trending_info=None, output_dir=None, date_str=None):
+    print("Stage 6: Designing content...")
+    with metrics.span("stage.render") as span:
+        designer = Designer()
+        # Prepare items once and share them across every output format
+        context = designer.prepare_context(
+            data=curated_data,
+            global_summary=global_summary,
+            trending_info=trending_info,
+            date=datetime.date.fromisoformat(date_str) if date_str else None
+        )
+        # Render, inline CSS, minify and trim signals to fit the email size budget; the other
+        # formats use the trimmed context so every part of the email lists the same signals
+        optimizer = PayloadOptimizer()
+        html, context = optimizer.build(designer, context)
+        outputs = {"html": html}
+        outputs.update(designer.render_all(context, formats=("text", "markdown", "json")))
+        span.set(html_bytes=len(outputs["html"].encode("utf-8")))
+
+    paths = {fmt: os.path.join(output_dir or "", OUTPUT_FILES[fmt]) for fmt in outputs}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    for fmt, content in outputs.items():
+        with open(paths[fmt], "w") as f:
+            f.write(content)
+
+    print(f"Digest generated at {', '.join(paths.values())}")
+
+async def main(is_weekend=None):
     print(f"Starting Research Agent at {datetime.datetime.now()}")
 
     # Cleanup old logs
     cleanup_old_logs()
 
-    weekday = datetime.datetime.now().weekday()
-    is_weekend = (weekday == 5 or weekday == 6)
-    
-    print(f"Day is {weekday} (Is Weekend mode: {is_weekend})")
+    if is_weekend is None:
+        is_weekend = is_weekend_today()
+
+    print(f"Day is {datetime.datetime.now().weekday()} (Is Weekend mode: {is_weekend})")
 
     # 1. Fetch
-    print("Stage 1: Fetching content in parallel...")
-    fetcher = Fetcher()
-    raw_items = await fetcher.fetch_all()
-    print(f"Fetched {len(raw_items)} items.")
+    raw_items = await fetch_stage()
+    await enrich_stage(raw_items)
 
     if not raw_items:
         # Check if backlog has anything before giving up, on any day
@@ -69,55 +203,405 @@ async def main():
         backlog = curator.load_backlog()
         if not backlog:
             print("No new items and empty backlog. Skipping email.")
-            # Remove daily_digest.html if it exists from a previous run to avoid sending stale content
-            if os.path.exists("daily_digest.html"):
-                os.remove("daily_digest.html")
+            remove_stale_outputs()
             return
         else:
             print(f"No new items, but {len(backlog)} items in backlog. Proceeding.")
             processed_items = []
-            processor = Processor()
-    else:
+
+    # The Processor (and its API key) is only needed from here on
+    from modules.processor import Processor
+    processor = Processor()
+    if raw_items:
         # 2. Process (Summarize & Score)
-        print("Stage 2: Processing content with Gemini in parallel...")
-        processor = Processor()
-        processed_items = await processor.process_batch(raw_items)
-        print("Processing complete.")
+        processed_items = await process_stage(processor, raw_items)
 
-    # 3. Curate
-    print("Stage 3: Curating content...")
-    curator = Curator()
-    curated_data = curator.curate(processed_items, is_weekend=is_weekend)
-    
-    # Save log of curated data (includes sources & relevance scores)
-    save_daily_log(curated_data)
-    
-    # 4. Global Summary
-    print("Stage 4: Generating Global Summary...")
-    global_summary = await processor.generate_global_summary(curated_data.get('detailed_items', []))
-    
-    # 5. Saturday Special: Trending Deep Dive
-    trending_info = None
-    if is_weekend:
-        print("Stage 5: Generating Weekly Deep Dive...")
-        trending_info = await processor.generate_trending_topics(curated_data.get('items', []))
+    await digest_stage(processor, processed_items, is_weekend)
+
+async def digest_stage(processor, processed_items, is_weekend):
+    """Curate, summarize and render: everything after items have been processed."""
+    # 3. Curate (after linking items to earlier coverage)
+    relate_stage(processed_items)
+    curated_data = curate_stage(processed_items, is_weekend)
+
+    # 4-5. Global Summary and Weekend Deep Dive
+    global_summary, trending_info = await summary_stage(processor, curated_data, is_weekend)
+
+    # Log of curated data (sources & relevance scores) with the summaries, so the digest can be
+    # re-rendered without Gemini
+    save_daily_log({**curated_data, "global_summary": global_summary, "trending_info": trending_info})
 
     # 6. Design
-    print("Stage 6: Designing content...")
-    designer = Designer()
-    html_content = designer.render(
-        data=curated_data, 
-        global_summary=global_summary, 
-        trending_info=trending_info
+    render_stage(curated_data, global_summary, trending_info)
+
+def next_digest_time(now):
+    """Next UTC datetime matching config.DIGEST_TIME_UTC strictly after 'now'."""
+    hour, minute = (int(part) for part in config.DIGEST_TIME_UTC.split(":"))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += datetime.timedelta(days=1)
+    return candidate
+
+async def ingest_once(store, processor):
+    """Fetches feeds and processes only items the store hasn't seen yet."""
+    raw_items = await fetch_stage()
+    new_items = store.filter_new(raw_items)
+    print(f"[Daemon] {len(new_items)} new items (of {len(raw_items)} fetched), {len(store.items)} pending")
+    if new_items:
+        await enrich_stage(new_items)
+        processed_items = await process_stage(processor, new_items)
+        added = store.add(processed_items)
+        if added < len(processed_items):
+            print(f"[Daemon] {len(processed_items) - added} items failed processing; retrying them with backoff")
+
+async def digest_from_store(store, processor, is_weekend=None, on_digest=None):
+    if is_weekend is None:
+        # Same UTC clock as DIGEST_TIME_UTC, so a non-UTC host can't be a day off near midnight
+        is_weekend = is_weekend_today(datetime.datetime.now(datetime.timezone.utc))
+    pending = store.pending()
+    print(f"[Daemon] Building digest from {len(pending)} pending items (Is Weekend mode: {is_weekend})")
+
+    if not pending and not Curator().load_backlog():
+        print("No new items and empty backlog. Skipping email.")
+        remove_stale_outputs()
+        store.clear_pending(pending)
+        return
+
+    await digest_stage(processor, pending, is_weekend)
+    # Only now: if the digest fails, its items stay pending for the retry
+    store.clear_pending(pending)
+    if on_digest:
+        # e.g. a script that mails daily_digest.html
+        proc = await asyncio.create_subprocess_shell(on_digest)
+        await proc.wait()
+        print(f"[Daemon] on-digest hook exited with {proc.returncode}")
+
+async def serve(args):
+    """
+    Long-running mode: polls feeds every POLL_INTERVAL_MINUTES and processes new items into
+    the pending store, so at DIGEST_TIME_UTC only curation, summaries and rendering remain.
+    """
+    from modules.processor import Processor
+    from modules.store import ItemStore
+
+    store = ItemStore()
+    processor = Processor()
+    poll_interval = datetime.timedelta(minutes=config.POLL_INTERVAL_MINUTES)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    next_poll = now
+    next_digest = next_digest_time(now)
+    print(f"[Daemon] Polling every {config.POLL_INTERVAL_MINUTES} min | Next digest at {next_digest.isoformat()} | {len(store.items)} pending")
+
+    while True:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if now >= next_digest:
+            try:
+                cleanup_old_logs()
+                await digest_from_store(store, processor, on_digest=args.on_digest)
+                next_digest = next_digest_time(now)
+                print(f"[Daemon] Next digest at {next_digest.isoformat()}")
+            except Exception as e:
+                # Back off instead of retrying (and calling Gemini) in a tight loop; polls continue meanwhile
+                next_digest = now + datetime.timedelta(minutes=config.DIGEST_RETRY_MINUTES)
+                print(f"[Daemon] ✗ Digest failed: {repr(e)} | Retrying at {next_digest.isoformat()}")
+        elif now >= next_poll:
+            try:
+                await ingest_once(store, processor)
+            except Exception as e:
+                # Keep the daemon alive; the next poll retries
+                print(f"[Daemon] ✗ Poll failed: {repr(e)}")
+            next_poll = now + poll_interval
+
+        if metrics.enabled():
+            # Keep the textfile fresh for node_exporter between cycles
+            metrics.export(prom_path=config.METRICS_PROM_FILE)
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        wait = min(next_poll, next_digest) - now
+        await asyncio.sleep(max(0.0, wait.total_seconds()))
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=json_default)
+    os.replace(tmp_path, path)
+
+def _read_items(path):
+    with open(path, "r") as f:
+        return items_from_dicts(json.load(f))
+
+def backfill_windows(start_date, end_date):
+    """(date, window start, window end) per day: the window the on-time daily run would have used."""
+    from modules.fetcher import _get_lookback_hours
+
+    hour, minute = (int(part) for part in config.DIGEST_TIME_UTC.split(":"))
+    windows = []
+    day = start_date
+    while day <= end_date:
+        run_time = datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=datetime.timezone.utc)
+        windows.append((day, run_time - datetime.timedelta(hours=_get_lookback_hours(run_time)), run_time))
+        day += datetime.timedelta(days=1)
+    return windows
+
+async def backfill_fetch(windows):
+    """
+    Fetches every feed once for the whole range (feeds only hold their latest entries anyway)
+    and ArXiv once per day. Results are cached in BACKFILL_DIR, so a resumed backfill refetches
+    nothing; RSS is fetched again when a later backfill reaches outside the cached window.
+    """
+    from modules.fetcher import Fetcher
+
+    def fetch_arxiv_days():
+        # One thread, one query at a time: keeps to ArXiv's delay between requests
+        by_day = {}
+        for day, start, end in windows:
+            path = os.path.join(config.BACKFILL_DIR, f"arxiv_{day}.json")
+            if os.path.exists(path):
+                by_day[day] = _read_items(path)
+                continue
+            by_day[day] = Fetcher(rss_feeds=[], cutoff_date=start, end_date=end).fetch_arxiv()
+            # An empty result may be a failed request; leave it uncached so a resume retries
+            if by_day[day]:
+                _write_json(path, by_day[day])
+        return by_day
+
+    async def fetch_rss_range():
+        # The cache records the window it covers; a range outside it is fetched again
+        path = os.path.join(config.BACKFILL_DIR, "rss.json")
+        start, end = windows[0][1], windows[-1][2]
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                cached = json.load(f)
+            if (isinstance(cached, dict) and datetime.datetime.fromisoformat(cached["start"]) <= start
+                    and datetime.datetime.fromisoformat(cached["end"]) >= end):
+                return items_from_dicts(cached["items"])
+        fetcher = Fetcher(cutoff_date=start, end_date=end)
+        items = await fetcher.fetch_rss()
+        _write_json(path, {"start": start.isoformat(), "end": end.isoformat(), "items": items})
+        return items
+
+    print(f"Stage 1: Fetching RSS once and ArXiv for {len(windows)} days...")
+    with metrics.span("stage.fetch") as span:
+        rss_items, arxiv_by_day = await asyncio.gather(fetch_rss_range(), asyncio.to_thread(fetch_arxiv_days))
+        span.set(items=len(rss_items) + sum(len(papers) for papers in arxiv_by_day.values()))
+    return rss_items, arxiv_by_day
+
+async def backfill_process(processor, items):
+    """
+    Processes each unique item once for the whole backfill. Results are appended to
+    BACKFILL_DIR/processed.jsonl as they arrive, so an interrupted backfill resumes where it stopped.
+    """
+    path = os.path.join(config.BACKFILL_DIR, "processed.jsonl")
+    cache = {}
+    complete_last_line = True
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                complete_last_line = line.endswith("\n")
+                try:
+                    item = Item.from_dict(json.loads(line))
+                except ValueError:
+                    continue  # A line cut short by a crash
+                cache[item.id] = item
+
+    todo = list({item.id: item for item in items if item.id not in cache}.values())
+    print(f"Stage 2: Processing {len(todo)} items ({len(cache)} already processed)...")
+    await enrich_stage(todo)
+    os.makedirs(config.BACKFILL_DIR, exist_ok=True)
+    with open(path, "a") as f, metrics.span("stage.process", items=len(todo)):
+        if not complete_last_line:
+            f.write("\n")
+        async def process_one(item):
+            await processor.process_item(item)
+            cache[item.id] = item
+            if "error" not in item.processed.extra:
+                f.write(json.dumps(item.to_dict(), default=json_default) + "\n")
+                f.flush()
+
+        await asyncio.gather(*(process_one(item) for item in todo))
+    return cache
+
+async def backfill(start_date, end_date, llm_concurrency=None, parallel_days=None):
+    """
+    Rebuilds the digests of past days as if each had run on time: per-day BACKFILL_DIR/digest_<date>.json
+    and BACKFILL_OUTPUT_DIR/<date>/daily_digest.*. Fetching and Gemini calls are shared across days
+    and run in parallel. Curation runs day by day, since each day's backlog feeds the next; the
+    backlog after every day is snapshotted so a rerun resumes at the first unfinished day.
+    The live backlog.json only seeds the first day, and the real logs/digest_<date>.json of days
+    that did run are never touched (backfilled items are added to the related-coverage index).
+    """
+    from modules.processor import Processor
+
+    windows = backfill_windows(start_date, end_date)
+    done = [os.path.exists(os.path.join(config.BACKFILL_OUTPUT_DIR, str(day), OUTPUT_FILES["html"]))
+            for day, _, _ in windows]
+    # Each day's backlog depends on the previous one, so everything after the first gap is rebuilt
+    first_pending = done.index(False) if False in done else len(windows)
+    pending = windows[first_pending:]
+    print(f"[Backfill] {start_date} → {end_date}: {len(windows)} days, {len(pending)} to build")
+    if not pending:
+        return
+
+    processor = Processor(max_concurrency=llm_concurrency or config.BACKFILL_LLM_CONCURRENCY)
+    rss_items, arxiv_by_day = await backfill_fetch(pending)
+    day_items = {
+        day: [item for item in rss_items if start < datetime.datetime.fromisoformat(item.published) <= end]
+        + arxiv_by_day.get(day, [])
+        for day, start, end in pending
+    }
+    processed = await backfill_process(processor, [item for items in day_items.values() for item in items])
+
+    # Curate in date order, chaining the backlog from one day to the next
+    curated_by_day = {}
+    previous_backlog = BACKLOG_FILE
+    for day, _, _ in windows:
+        snapshot = os.path.join(config.BACKFILL_DIR, f"backlog_{day}.json")
+        if day in day_items:
+            if os.path.exists(previous_backlog):
+                shutil.copyfile(previous_backlog, snapshot)
+            elif os.path.exists(snapshot):
+                os.remove(snapshot)
+            print(f"[Backfill] Curating {day}")
+            items = [processed[item.id] for item in day_items[day] if item.id in processed]
+            relate_stage(items, str(day))
+            curated_by_day[day] = curate_stage(items, day.weekday() in (5, 6), curator=Curator(backlog_file=snapshot))
+        previous_backlog = snapshot
+
+    # Summaries and rendering are independent per day
+    sem = asyncio.Semaphore(parallel_days or config.BACKFILL_PARALLEL_DAYS)
+
+    async def finish_day(day, curated_data):
+        async with sem:
+            is_weekend = day.weekday() in (5, 6)
+            global_summary, trending_info = await summary_stage(processor, curated_data, is_weekend)
+            save_daily_log({**curated_data, "global_summary": global_summary, "trending_info": trending_info},
+                           str(day), log_dir=config.BACKFILL_DIR)
+            render_stage(curated_data, global_summary, trending_info,
+                         output_dir=os.path.join(config.BACKFILL_OUTPUT_DIR, str(day)), date_str=str(day))
+
+    await asyncio.gather(*(finish_day(day, curated) for day, curated in curated_by_day.items()))
+    print(f"[Backfill] Built {len(curated_by_day)} digests in {config.BACKFILL_OUTPUT_DIR}/")
+
+async def run_fetch(args):
+    raw_items = await fetch_stage()
+    await enrich_stage(raw_items)
+    save_stage_log("fetched", raw_items, args.date)
+
+async def run_process(args):
+    from modules.processor import Processor
+    raw_items = items_from_dicts(load_stage_log("fetched", args.date))
+    processed_items = await process_stage(Processor(), raw_items)
+    save_stage_log("processed", processed_items, args.date)
+
+async def run_curate(args):
+    # Without --date the latest processed log is curated, into the digest log of the same date
+    date_str = args.date or latest_log_date("processed")
+    processed_items = items_from_dicts(load_stage_log("processed", date_str))
+    # Weekend mode follows the day of the log, not the day it is curated on
+    is_weekend = args.weekend or datetime.date.fromisoformat(date_str).weekday() in (5, 6)
+    print(f"Is Weekend mode: {is_weekend}")
+    relate_stage(processed_items, date_str)
+    save_daily_log(curate_stage(processed_items, is_weekend), date_str)
+
+async def run_render(args):
+    # Without --date the latest digest log is rendered, under its own date
+    date_str = args.date or latest_log_date("digest")
+    curated_data = curated_from_dict(load_stage_log("digest", date_str))
+    render_stage(
+        curated_data,
+        global_summary=curated_data.get("global_summary"),
+        trending_info=curated_data.get("trending_info"),
+        date_str=date_str
     )
-    
-    output_file = "daily_digest.html"
-    with open(output_file, "w") as f:
-        f.write(html_content)
-    
-    print(f"Digest generated at {output_file}")
+
+async def run_serve(args):
+    await serve(args)
+
+async def run_digest(args):
+    from modules.processor import Processor
+    from modules.store import ItemStore
+    await digest_from_store(ItemStore(), Processor(), is_weekend=True if args.weekend else None)
+
+async def run_shard(args):
+    from modules.processor import Processor
+    from modules.sharding import sharded_ingest
+
+    print(f"Starting Research Agent (sharded, {args.workers} workers) at {datetime.datetime.now()}")
+    cleanup_old_logs()
+    is_weekend = True if args.weekend else is_weekend_today()
+    processed_items = await sharded_ingest(args.workers, run_id=args.run, queue_path=args.queue)
+
+    if not processed_items and not Curator().load_backlog():
+        print("No new items and empty backlog. Skipping email.")
+        remove_stale_outputs()
+        return
+    await digest_stage(Processor(), processed_items, is_weekend)
+
+async def run_worker(args):
+    from modules.sharding import run_worker as shard_worker
+    await shard_worker(queue_path=args.queue, run_id=args.run)
+
+async def run_backfill(args):
+    cleanup_old_logs()
+    start_date = datetime.date.fromisoformat(args.start)
+    end_date = datetime.date.fromisoformat(args.end) if args.end else datetime.date.today()
+    if end_date < start_date:
+        raise SystemExit("--end must not be before --start")
+    await backfill(start_date, end_date, llm_concurrency=args.llm_concurrency, parallel_days=args.parallel_days)
+
+async def run_full(args):
+    await main(is_weekend=True if getattr(args, "weekend", False) else None)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Research Agent digest pipeline.")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record spans and metrics; writes logs/run_<date>.json and the Prometheus textfile.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    commands = {
+        "fetch": (run_fetch, "Fetch feeds and ArXiv into logs/fetched_<date>.json (no API key needed)."),
+        "process": (run_process, "Score and summarize logs/fetched_<date>.json with Gemini."),
+        "curate": (run_curate, "Curate logs/processed_<date>.json into logs/digest_<date>.json (updates backlog.json)."),
+        "render": (run_render, "Render the digest outputs from logs/digest_<date>.json (no API key needed)."),
+        "full": (run_full, "Run the whole pipeline (default)."),
+        "serve": (run_serve, "Daemon: poll and process continuously, build the digest at DIGEST_TIME_UTC."),
+        "digest": (run_digest, "Curate, summarize and render the daemon's pending store now."),
+        "shard": (run_shard, "Run the whole pipeline with fetching and processing split across worker processes."),
+        "backfill": (run_backfill, "Rebuild past days' logs and digests (digests/<date>/) over a date range."),
+        "worker": (run_worker, "Work on a sharded run's queue (e.g. from another machine sharing the queue file)."),
+    }
+    for name, (handler, help_text) in commands.items():
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.set_defaults(handler=handler)
+        if name in ("fetch", "process", "curate", "render"):
+            sub.add_argument("--date", help="Log date (YYYY-MM-DD). Defaults to today, or the latest log when reading.")
+        if name in ("curate", "full", "digest", "shard"):
+            sub.add_argument("--weekend", action="store_true", help="Force weekend curation mode.")
+        if name == "serve":
+            sub.add_argument("--on-digest", help="Shell command to run after each digest is rendered (e.g. send the email).")
+        if name == "shard":
+            sub.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                             help="Local worker processes, including this one (default: CPU count).")
+        if name == "backfill":
+            sub.add_argument("--start", required=True, help="First day to rebuild (YYYY-MM-DD).")
+            sub.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD, inclusive). Defaults to today.")
+            sub.add_argument("--llm-concurrency", type=int, help=f"Gemini calls in flight (default {config.BACKFILL_LLM_CONCURRENCY}).")
+            sub.add_argument("--parallel-days", type=int, help=f"Days summarized/rendered at once (default {config.BACKFILL_PARALLEL_DAYS}).")
+        if name in ("shard", "worker"):
+            sub.add_argument("--run", help="Run ID. shard: resume this run. worker: join it (default: the latest active run).")
+            sub.add_argument("--queue", default=config.SHARD_QUEUE_FILE, help="Work queue file, shared by all workers.")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args.handler = run_full
+    return args
 
 if __name__ == "__main__":
-    import urllib3
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    asyncio.run(main())
+    args = parse_args()
+    if args.metrics or os.environ.get("RESEARCH_AGENT_METRICS") == "1":
+        metrics.enable()
+    try:
+        asyncio.run(args.handler(args))
+    finally:
+        metrics.export(json_path=_log_path("run"), prom_path=config.METRICS_PROM_FILE)
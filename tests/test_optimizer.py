@@ -0,0 +1,99 @@
+# tests/test_optimizer.py
+import unittest
+
+from modules.optimizer import PayloadOptimizer
+
+
+class InliningTest(unittest.TestCase):
+    def setUp(self):
+        self.optimizer = PayloadOptimizer()
+
+    def test_rules_are_inlined_and_style_block_dropped(self):
+        html = ('<html><head><style>\n p { color: red; margin: 0 }\n .a { font-weight: bold }\n</style></head>'
+                '<body><p class="a">Hi</p></body></html>')
+        self.assertEqual(
+            self.optimizer.optimize(html),
+            '<html><head></head><body><p class="a" style="color:red;margin:0;font-weight:bold">Hi</p></body></html>',
+        )
+
+    def test_media_queries_and_pseudo_classes_stay_in_style(self):
+        html = ('<style>.item{border-bottom:1px solid #eee;padding:4px}.item:last-child{border-bottom:none}'
+                'a:hover{text-decoration:underline}@media (max-width: 600px){.item{padding:0}.box{width:100%}}'
+                '</style><div class="item">x</div>')
+        # !important only where an inlined property would otherwise win
+        self.assertEqual(
+            self.optimizer.optimize(html),
+            '<style>@media (max-width: 600px){.item{padding:0 !important}.box{width:100%}}'
+            '.item:last-child{border-bottom:none !important}a:hover{text-decoration:underline}</style>'
+            '<div class="item" style="border-bottom:1px solid #eee;padding:4px">x</div>',
+        )
+
+    def test_specificity_then_source_order_then_style_attribute(self):
+        html = ('<style>.card p{color:blue}p{color:red;font-size:12px}.lead{color:green}.lead{color:purple}'
+                'div.card .lead{color:black}</style>'
+                '<div class="card"><p>a</p><p class="lead">b</p><p class="lead" style="color:orange">c</p></div>')
+        self.assertEqual(
+            self.optimizer.optimize(html),
+            '<div class="card"><p style="font-size:12px;color:blue">a</p>'
+            '<p class="lead" style="font-size:12px;color:black">b</p>'
+            '<p class="lead" style="font-size:12px;color:orange">c</p></div>',
+        )
+
+    def test_semicolons_inside_urls_and_strings_are_kept(self):
+        html = ('<style>.logo{background:url("data:image/png;base64,AAA=") no-repeat;width:10px}'
+                '.q:after{content:"a;b"}</style><span class="logo"></span>')
+        self.assertEqual(
+            self.optimizer.optimize(html),
+            '<style>.q:after{content:"a;b"}</style><span class="logo" '
+            'style="background:url(&quot;data:image/png;base64,AAA=&quot;) no-repeat;width:10px"></span>',
+        )
+
+    def test_whitespace_kept_between_inline_elements_only(self):
+        html = '<div>\n  <p> ‣ <b>Gemini 3</b> <i>Deep</i>  Think </p>\n</div>'
+        self.assertEqual(self.optimizer.optimize(html), '<div><p>‣ <b>Gemini 3</b> <i>Deep</i> Think</p></div>')
+
+
+class FakeDesigner:
+    """Renders one fixed-size <li> per signal and counts renders."""
+
+    def __init__(self):
+        self.renders = 0
+
+    def render_format(self, context, fmt):
+        self.renders += 1
+        items = ''.join(f'<li>{signal}</li>' for signal in context['signals'])
+        return f'<html><body><p>{context["title"]}</p><ul>{items}</ul></body></html>'
+
+
+class TrimmingTest(unittest.TestCase):
+    def setUp(self):
+        self.signals = [f"signal {i:03d} " + "x" * 80 for i in range(200)]
+        self.context = {"title": "Digest", "signals": self.signals}
+        self.base = len('<html><body><p>Digest</p><ul></ul></body></html>')
+        self.per_signal = len(f'<li>{self.signals[0]}</li>')
+
+    def test_no_trimming_within_budget(self):
+        designer = FakeDesigner()
+        html, context = PayloadOptimizer(size_budget=10**6).build(designer, self.context)
+        self.assertEqual(context["signals"], self.signals)
+        self.assertEqual(designer.renders, 1)
+
+    def test_keeps_the_most_signals_that_fit_in_log_renders(self):
+        budget = self.base + 57 * self.per_signal + 10
+        designer = FakeDesigner()
+        html, context = PayloadOptimizer(size_budget=budget).build(designer, self.context)
+        self.assertEqual(context["signals"], self.signals[:57])
+        self.assertLessEqual(len(html.encode("utf-8")), budget)
+        self.assertIn(self.signals[56], html)
+        self.assertNotIn(self.signals[57], html)
+        self.assertLessEqual(designer.renders, 10)  # 1 + ceil(log2(200))
+        self.assertEqual(self.context["signals"], self.signals)  # The caller's context is untouched
+
+    def test_drops_every_signal_when_nothing_fits(self):
+        html, context = PayloadOptimizer(size_budget=10).build(FakeDesigner(), self.context)
+        self.assertEqual(context["signals"], [])
+        self.assertNotIn("<li>", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
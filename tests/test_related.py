@@ -0,0 +1,76 @@
+# tests/test_related.py
+import random
+import tempfile
+import unittest
+
+from modules import config
+from modules.models import Item, ProcessedResult
+from modules.related import RelatedIndex
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class SyntheticCorpus:
+    """Items built from a shared Zipf-weighted vocabulary plus a few topic-specific words each."""
+
+    def __init__(self, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.common = [self.word() for _ in range(2000)]
+        self.weights = [1 / (rank + 1) for rank in range(len(self.common))]
+        self.count = 0
+
+    def word(self) -> str:
+        return "".join(self.rng.choice(LETTERS) for _ in range(self.rng.randint(4, 10)))
+
+    def topic(self):
+        return [self.word() for _ in range(40)]
+
+    def item(self, topic, words: int = 120) -> Item:
+        tokens = self.rng.choices(self.common, weights=self.weights, k=words // 2)
+        tokens += [self.rng.choice(topic) for _ in range(words // 2)]
+        self.rng.shuffle(tokens)
+        self.count += 1
+        return Item(title=" ".join(tokens[:8]), link=f"https://example.com/{self.count}",
+                    processed=ProcessedResult(summary=" ".join(tokens), relevance_score=5))
+
+
+class RelatedIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.corpus = SyntheticCorpus()
+        cls.topics = [cls.corpus.topic() for _ in range(600)]
+        cls.indexed = [cls.corpus.item(cls.topics[i % len(cls.topics)]) for i in range(3000)]
+        cls.index = RelatedIndex(cls.tmp.name)
+        cls.index.append(cls.indexed, "2026-01-01")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_unrelated_items_get_no_links(self):
+        unrelated = [self.corpus.item(self.corpus.topic()) for _ in range(200)]
+        self.index.annotate(unrelated, "2026-02-01")
+        linked = [item for item in unrelated if item.related]
+        self.assertEqual(linked, [], f"{len(linked)} of 200 unrelated items got 'previously covered' links")
+
+    def test_same_topic_items_are_linked(self):
+        related = [self.corpus.item(topic) for topic in self.topics[:50]]
+        self.index.annotate(related, "2026-02-01")
+        self.assertTrue(all(item.related for item in related))
+
+    def test_near_repeat_scores_above_repeat_threshold(self):
+        original = self.indexed[0]
+        repeat = Item(title=original.title, link="https://example.com/follow-up", processed=original.processed)
+        self.index.annotate([repeat], "2026-02-01")
+        self.assertEqual(repeat.related[0]["link"], original.link)
+        self.assertGreaterEqual(repeat.related[0]["similarity"], config.RELATED_REPEAT_SIMILARITY)
+
+    def test_later_and_same_items_are_excluded(self):
+        self.assertEqual(self.index.search(self.indexed[:5], 3, before_date="2026-01-01"), [[]] * 5)
+        for item, matches in zip(self.indexed[:5], self.index.search(self.indexed[:5], 3)):
+            self.assertNotIn(item.id, [m["id"] for m in matches])
+
+
+if __name__ == "__main__":
+    unittest.main()